@@ -0,0 +1,14 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+if __name__ == "__main__":
+    pass
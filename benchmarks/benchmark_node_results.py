@@ -0,0 +1,115 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Compares memory use and CSV write throughput of the list of node dictionaries previously built by
+get_all_node_data with the columnar NodeResults container. Runs without the MIKE .NET libraries.
+
+Usage: python -m benchmarks.benchmark_node_results [number_of_nodes] [number_of_files]
+"""
+
+from typing import Dict, List, Tuple
+from csv import DictWriter
+from os import remove
+from os.path import join
+from sys import argv
+from time import perf_counter
+import random
+import tempfile
+import tracemalloc
+
+from dpc.extraction.node_results import NodeResults
+from dpc.output.create_output_files import construct_csv
+
+
+def get_file_data(number_of_nodes: int, seed: int) -> Dict[str, Dict[str, any]]:
+    """Node values in the form output by get_data"""
+    generator = random.Random(seed)
+    return {
+        f"SUMN.Junction.CCCGIS.{i}": {
+            "x": 1580000.0 + generator.random() * 1000.0,
+            "y": 5174000.0 + generator.random() * 1000.0,
+            "invert_level": generator.random() * 20.0,
+            "max_water_level": generator.random() * 25.0,
+            "max_water_level_timing": generator.randint(0, 500),
+        }
+        for i in range(number_of_nodes)
+    }
+
+
+def build_dictionaries(file_data: List[Tuple[str, Dict[str, Dict[str, any]]]]) -> List[Dict[str, any]]:
+    all_node_data = []
+    for file_name, nodes in file_data:
+        for node_id, values in nodes.items():
+            node_payload = {
+                "file": file_name,
+                "file_type": "prf",
+                "projection": "",
+                "node_id": node_id,
+            }
+            node_payload.update(values.items())
+            all_node_data.append(node_payload)
+    return all_node_data
+
+
+def build_node_results(file_data: List[Tuple[str, Dict[str, Dict[str, any]]]]) -> NodeResults:
+    node_results = NodeResults()
+    for file_name, nodes in file_data:
+        node_results.append_file(file_name, "prf", "", nodes)
+    node_results.node_codes  # consolidate
+    return node_results
+
+
+def write_dictionaries(data: List[Dict[str, any]], output_file_path: str) -> None:
+    with open(output_file_path, "w", newline="") as csv_file:
+        writer = DictWriter(csv_file, fieldnames=list(data[0].keys()))
+        writer.writeheader()
+        writer.writerows(data)
+
+
+def measure(function, *args) -> Tuple[any, float, float]:
+    """Returns result, retained MB and seconds - per file inputs are generated lazily so are excluded"""
+    tracemalloc.start()
+    start = perf_counter()
+    result = function(*args)
+    elapsed = perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained / 1024 / 1024, elapsed
+
+
+def run(number_of_nodes: int = 20000, number_of_files: int = 20) -> None:
+    file_data = [(f"file_{j:03d}.PRF", get_file_data(number_of_nodes, j)) for j in range(number_of_files)]
+    print(f"{number_of_nodes} nodes x {number_of_files} files")
+
+    dictionaries, dictionaries_mb, dictionaries_build_s = measure(build_dictionaries, file_data)
+    node_results, node_results_mb, node_results_build_s = measure(build_node_results, file_data)
+    del file_data
+
+    output_file_path = join(tempfile.gettempdir(), "benchmark_node_results.csv")
+    start = perf_counter()
+    write_dictionaries(dictionaries, output_file_path)
+    dictionaries_write_s = perf_counter() - start
+    start = perf_counter()
+    construct_csv(node_results, output_file_path)
+    node_results_write_s = perf_counter() - start
+    remove(output_file_path)
+
+    print(f"{'structure':<20} {'memory (MB)':>12} {'build (s)':>10} {'write (s)':>10} {'rows/s':>12}")
+    rows = len(node_results)
+    for name, mb, build_s, write_s in [
+        ("list of dicts", dictionaries_mb, dictionaries_build_s, dictionaries_write_s),
+        ("NodeResults", node_results_mb, node_results_build_s, node_results_write_s),
+    ]:
+        print(f"{name:<20} {mb:>12.1f} {build_s:>10.2f} {write_s:>10.2f} {rows / write_s:>12.0f}")
+
+
+if __name__ == "__main__":
+    run(*[int(e) for e in argv[1:3]])
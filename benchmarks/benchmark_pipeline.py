@@ -0,0 +1,228 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Times each stage of the extraction pipeline and records its peak traced memory at several network sizes using
+synthetic result data. Runs without the MIKE .NET libraries. Results can be saved and compared against a previous
+run - the exit code is 1 if any stage is slower than the baseline by more than the tolerance.
+
+Usage: python -m benchmarks.benchmark_pipeline [--sizes small medium] [--files 3] [--output results.json]
+                                               [--baseline results.json] [--tolerance 0.25]
+"""
+
+from typing import Callable, Dict, List, Tuple
+from argparse import ArgumentParser
+from json import dump, load
+from os.path import join
+from shutil import rmtree
+from time import perf_counter, process_time
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic_result_data import SyntheticResultData
+from dpc.extraction.extract_parameters import get_data
+from dpc.extraction.node_results import NodeResults
+from dpc.output.create_output_files import construct_csv, construct_formatted_csv, construct_geojson
+
+NETWORK_SIZES = {  # number_of_nodes, number_of_reaches, grid_points_per_reach, number_of_time_steps
+    "small": (1000, 100, 21, 288),
+    "medium": (10000, 1000, 21, 288),
+    "large": (50000, 5000, 21, 576),
+}
+FROM_CRS = "epsg:2193"
+
+
+def measure(function: Callable, *args, trace_memory: bool = True, **kwargs) -> Tuple[any, Dict[str, float]]:
+    """Returns result and wall seconds, cpu seconds and peak traced MB of a single call"""
+    if trace_memory:
+        tracemalloc.start()
+    start, start_cpu = perf_counter(), process_time()
+    result = function(*args, **kwargs)
+    measurement = {"wall_s": perf_counter() - start, "cpu_s": process_time() - start_cpu, "peak_mb": None}
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        measurement["peak_mb"] = peak / 1024 / 1024
+    return result, measurement
+
+
+def run_size(size: str, number_of_files: int, trace_memory: bool = True) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every pipeline stage for one network size
+    :param size: key of NETWORK_SIZES
+    :param number_of_files: number of result files - same network with different water levels
+    :param trace_memory: record peak memory - tracing slows pure Python stages
+    :return: measurements by stage
+    """
+    number_of_nodes, number_of_reaches, grid_points_per_reach, number_of_time_steps = NETWORK_SIZES[size]
+    results = {}
+    file_data = []
+    for j in range(number_of_files):
+        prf_data = SyntheticResultData(number_of_nodes, 0, grid_points_per_reach, number_of_time_steps, seed=j)
+        res11_data = SyntheticResultData(0, number_of_reaches, grid_points_per_reach, number_of_time_steps, seed=j)
+        res11_df = res11_data.to_data_frame()
+
+        (prf_nodes, projection), prf_measurement = measure(
+            get_data, prf_data, include_reaches=False, trace_memory=trace_memory
+        )
+        (res11_nodes, _), res11_measurement = measure(
+            get_data, res11_data, df=res11_df, include_nodes=False, trace_memory=trace_memory
+        )
+        for stage, measurement in [("get_data prf", prf_measurement), ("get_data res11", res11_measurement)]:
+            add_measurement(results, stage, measurement)
+        file_data.append((f"file_{j:03d}.PRF", "prf", projection, prf_nodes))
+        file_data.append((f"file_{j:03d}.res11", "res11", projection, res11_nodes))
+        del prf_data, res11_data, res11_df
+
+    def build_node_results() -> NodeResults:
+        node_results = NodeResults()
+        for file_name, file_type, projection, nodes in file_data:
+            node_results.append_file(file_name=file_name, file_type=file_type, projection=projection, nodes=nodes)
+        node_results.node_codes  # consolidate
+        return node_results
+
+    node_results, results["node_results"] = measure(build_node_results, trace_memory=trace_memory)
+    del file_data
+
+    output_directory = tempfile.mkdtemp(prefix="dpc_benchmark_")
+    try:
+        ordered_data_files = node_results.files
+        _, results["construct_formatted_csv"] = measure(
+            construct_formatted_csv,
+            data=node_results,
+            output_file_path_no_extension=join(output_directory, "results.csv"),
+            critical_durations={file_name: file_name[5:8] for file_name in ordered_data_files},
+            ordered_data_files=ordered_data_files,
+            round_decimals=True,
+            trace_memory=trace_memory,
+        )
+        _, results["construct_csv"] = measure(
+            construct_csv,
+            data=node_results,
+            output_file_path_no_extension=join(output_directory, "node_data"),
+            round_decimals=True,
+            trace_memory=trace_memory,
+        )
+        _, results["construct_geojson"] = measure(
+            construct_geojson, from_crs=FROM_CRS, nodes=node_results, trace_memory=trace_memory
+        )
+    finally:
+        rmtree(output_directory, ignore_errors=True)
+
+    return results
+
+
+def add_measurement(results: Dict[str, Dict[str, float]], stage: str, measurement: Dict[str, float]) -> None:
+    """Sums times and takes the largest peak of a stage run once per file"""
+    if stage not in results:
+        results[stage] = measurement
+        return
+    results[stage]["wall_s"] += measurement["wall_s"]
+    results[stage]["cpu_s"] += measurement["cpu_s"]
+    if measurement["peak_mb"] is not None:
+        results[stage]["peak_mb"] = max(results[stage]["peak_mb"], measurement["peak_mb"])
+
+
+def get_regressions(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Compares wall times and peak memory with a baseline
+    :param results: measurements by size and stage
+    :param baseline: measurements by size and stage of a previous run
+    :param tolerance: allowed fractional increase i.e. 0.25
+    :return: descriptions of stages exceeding the baseline by more than the tolerance
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, measurement in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous is None:
+                continue
+            for key in ["wall_s", "peak_mb"]:
+                if measurement.get(key) is None or not previous.get(key):
+                    continue
+                if measurement[key] > previous[key] * (1 + tolerance):
+                    regressions.append(f"{size} {stage} {key}: {previous[key]:.3f} -> {measurement[key]:.3f}")
+    return regressions
+
+
+def print_results(size: str, number_of_files: int, stages: Dict[str, Dict[str, float]]) -> None:
+    number_of_nodes, number_of_reaches, grid_points_per_reach, number_of_time_steps = NETWORK_SIZES[size]
+    print(
+        f"\n{size}: {number_of_nodes} nodes, {number_of_reaches} reaches x {grid_points_per_reach} grid points, "
+        f"{number_of_time_steps} time steps, {number_of_files} prf + {number_of_files} res11 files"
+    )
+    print(f"{'stage':<26} {'wall (s)':>10} {'cpu (s)':>10} {'peak (MB)':>10}")
+    for stage, measurement in stages.items():
+        peak = f"{measurement['peak_mb']:>10.1f}" if measurement["peak_mb"] is not None else f"{'-':>10}"
+        print(f"{stage:<26} {measurement['wall_s']:>10.3f} {measurement['cpu_s']:>10.3f} {peak}")
+
+
+def run(
+    sizes: List[str] = None,
+    number_of_files: int = 3,
+    output_file_path: str = None,
+    baseline_file_path: str = None,
+    tolerance: float = 0.25,
+    trace_memory: bool = True,
+) -> int:
+    """
+    Runs the benchmark at each network size
+    :param sizes: keys of NETWORK_SIZES - defaults to small and medium
+    :param number_of_files: number of prf and of res11 files per size
+    :param output_file_path: path to save results as JSON
+    :param baseline_file_path: path to JSON results of a previous run to compare against
+    :param tolerance: allowed fractional increase over the baseline
+    :param trace_memory: record peak memory
+    :return: exit code - 1 if a regression was found
+    """
+    results = {}
+    for size in sizes or ["small", "medium"]:
+        results[size] = run_size(size, number_of_files, trace_memory=trace_memory)
+        print_results(size, number_of_files, results[size])
+
+    if output_file_path is not None:
+        with open(output_file_path, "w") as output_file:
+            dump(results, output_file, indent=4)
+
+    if baseline_file_path is not None:
+        with open(baseline_file_path) as baseline_file:
+            regressions = get_regressions(results, load(baseline_file), tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the extraction pipeline with synthetic result data")
+    parser.add_argument("--sizes", nargs="+", choices=list(NETWORK_SIZES), default=["small", "medium"])
+    parser.add_argument("--files", type=int, default=3, help="number of prf and of res11 files per size")
+    parser.add_argument("--output", default=None, help="save results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare against results saved by a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional slow down over baseline")
+    parser.add_argument("--no-memory", action="store_true", help="do not trace memory - faster, no peak figures")
+    args = parser.parse_args()
+    sys.exit(
+        run(
+            sizes=args.sizes,
+            number_of_files=args.files,
+            output_file_path=args.output,
+            baseline_file_path=args.baseline,
+            tolerance=args.tolerance,
+            trace_memory=not args.no_memory,
+        )
+    )
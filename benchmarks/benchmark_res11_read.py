@@ -0,0 +1,72 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Compares mikeio1d Res1D.read_all, which adds DataFrame columns one at a time, with Res1DReader.read_all, which copies
+every time series into a single float32 array and builds the DataFrame once, on the sample res11 inputs. Each file is
+loaded once and read both ways. Requires the MIKE .NET libraries.
+
+Usage: python -m benchmarks.benchmark_res11_read [input_directory]
+"""
+
+from typing import Tuple
+from os.path import join, split, dirname, abspath
+from sys import argv
+from time import perf_counter
+import warnings
+
+from mikeio1d.res1d import Res1D
+
+from dpc.extraction.res1d_reader import Res1DReader
+from dpc.utils.get_files_recursively import FileManipulation
+
+import numpy as np
+
+DEFAULT_INPUT_DIRECTORY = join(dirname(dirname(abspath(__file__))), "inputs")
+
+
+def time_call(function, *args, **kwargs) -> Tuple[float, any]:
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return perf_counter() - start, result
+
+
+def run(input_directory: str = DEFAULT_INPUT_DIRECTORY) -> None:
+    file_paths = FileManipulation.get_files_recursively(
+        directory=input_directory,
+        file_extension_allow_list=["res11"],
+        exclude_filename_text="HDADD",
+    )
+
+    print(
+        f"{'file':<50} {'columns':>8} {'per column (s)':>15} {'block (s)':>10} {'speedup':>8} "
+        f"{'per column (MB)':>16} {'block (MB)':>11} {'same':>5}"
+    )
+    for file_path in file_paths:
+        _, file_name = split(file_path)
+        reader = Res1DReader(file_path)
+        _ = reader.time_index  # built once, outside both timings
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # PerformanceWarning of the fragmented frame
+            per_column_time, per_column_df = time_call(Res1D.read_all, reader)
+        block_time, block_df = time_call(reader.read_all)
+        same = list(per_column_df.columns) == list(block_df.columns) and np.array_equal(
+            per_column_df.to_numpy(dtype=np.float32), block_df.to_numpy(), equal_nan=True
+        )
+        print(
+            f"{file_name[:50]:<50} {block_df.shape[1]:>8} {per_column_time:>15.3f} {block_time:>10.3f} "
+            f"{per_column_time / max(block_time, 1e-9):>8.1f} "
+            f"{per_column_df.memory_usage(index=False).sum() / 1024 / 1024:>16.1f} "
+            f"{block_df.memory_usage(index=False).sum() / 1024 / 1024:>11.1f} {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    run(*argv[1:2])
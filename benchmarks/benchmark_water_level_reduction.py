@@ -0,0 +1,111 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Compares per-value water level reduction (one interop call per timestep per element) with the bulk array
+reduction in get_aggregated_water_levels on the sample inputs. Requires the MIKE .NET libraries.
+
+Usage: python -m benchmarks.benchmark_water_level_reduction [input_directory]
+"""
+
+from typing import Dict, Tuple
+from os.path import join, split, dirname, abspath
+from sys import argv
+from time import perf_counter
+
+from dpc.extraction.load_mike_file import load_prf_file, load_res_file
+from dpc.extraction.extract_parameters import get_aggregated_water_levels
+from dpc.utils.get_files_recursively import FileManipulation
+
+import numpy as np
+
+DEFAULT_INPUT_DIRECTORY = join(dirname(dirname(abspath(__file__))), "inputs")
+
+
+def per_value_node_reduction(data) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Reference reduction - iterates every node time series value through pythonnet"""
+    max_water_level, max_water_level_timings = {}, {}
+    for node in list(data.Nodes):
+        for node_data_set in list(node.DataItems):
+            if node_data_set.Quantity.Id in ["WaterLevel", "Water Level"]:
+                values = list(node_data_set.TimeData)
+                max_water_level[node.Id] = max(values)
+                max_water_level_timings[node.Id] = len(values) - 1 - values[::-1].index(max_water_level[node.Id])
+                break
+    return max_water_level, max_water_level_timings
+
+
+def per_value_reach_reduction(data) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Reference reduction - one GetValue call per timestep per grid point"""
+    max_water_level, max_water_level_timings = {}, {}
+    for reach in list(data.Reaches):
+        for reach_data_set in list(reach.DataItems):
+            if reach_data_set.Quantity.Id in ["WaterLevel", "Water Level"]:
+                element_data = []
+                for element_index in range(reach_data_set.NumberOfElements):
+                    element_data.append(
+                        max(
+                            reach_data_set.TimeData.GetValue(x, element_index)
+                            for x in range(reach_data_set.TimeData.NumberOfTimeSteps)
+                        )
+                    )
+                max_water_level[reach.Id] = max(element_data)
+                max_water_level_timings[reach.Id] = len(element_data) - 1 - element_data[::-1].index(max_water_level[reach.Id])
+                break
+    return max_water_level, max_water_level_timings
+
+
+def per_column_data_frame_reduction(df) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Reference reduction - converts each DataFrame column to a list"""
+    max_water_level, max_water_level_timings = {}, {}
+    for col in [col for col in df.columns if "Water Level" in col or "WaterLevel" in col]:
+        values = df[col].to_list()
+        max_water_level[col] = max(values)
+        max_water_level_timings[col] = len(values) - 1 - values[::-1].index(max_water_level[col])
+    return max_water_level, max_water_level_timings
+
+
+def time_call(function, *args, **kwargs) -> Tuple[float, any]:
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return perf_counter() - start, result
+
+
+def run(input_directory: str = DEFAULT_INPUT_DIRECTORY) -> None:
+    file_paths = FileManipulation.get_files_recursively(
+        directory=input_directory,
+        file_extension_allow_list=["prf", "res11"],
+        exclude_filename_text="HDADD",
+    )
+
+    print(f"{'file':<50} {'path':<10} {'per value (s)':>14} {'bulk (s)':>10} {'speedup':>8} {'same':>5}")
+    for file_path in file_paths:
+        _, file_name = split(file_path)
+        cases = []
+        if file_name.lower().endswith(".prf"):
+            data, _ = load_prf_file(file_path)
+            cases.append(("nodes", per_value_node_reduction, (data,), dict(include_reaches=False)))
+        else:
+            data, df = load_res_file(file_path)
+            cases.append(("reaches", per_value_reach_reduction, (data,), dict(include_nodes=False)))
+            cases.append(("dataframe", per_column_data_frame_reduction, (df,), dict(include_nodes=False, df=df)))
+
+        for path, reference, reference_args, kwargs in cases:
+            reference_time, (reference_maxima, _) = time_call(reference, *reference_args)
+            bulk_time, (bulk_maxima, _) = time_call(get_aggregated_water_levels, data, np.max, **kwargs)
+            same = sorted(reference_maxima.values()) == sorted(bulk_maxima.values())
+            print(
+                f"{file_name[:50]:<50} {path:<10} {reference_time:>14.3f} {bulk_time:>10.3f} "
+                f"{reference_time / max(bulk_time, 1e-9):>8.1f} {str(same):>5}"
+            )
+
+
+if __name__ == "__main__":
+    run(*argv[1:2])
@@ -0,0 +1,208 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Pure Python stand-in for the parts of the MIKE 1D ResultData surface used by dpc.extraction.extract_parameters
+so that the extraction pipeline can be exercised without Windows, MIKE or real result files.
+"""
+
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+H_POINT = 1025
+Q_POINT = 1024
+INTERPOLATED_H_POINT = 2
+PROJECTION_STRING = (
+    'PROJCS["NZGD_2000_New_Zealand_Transverse_Mercator",GEOGCS["GCS_NZGD_2000",DATUM["D_NZGD_2000",'
+    'SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+    'PROJECTION["Transverse_Mercator"],PARAMETER["False_Easting",1600000.0],PARAMETER["False_Northing",10000000.0],'
+    'PARAMETER["Central_Meridian",173.0],PARAMETER["Scale_Factor",0.9996],PARAMETER["Latitude_Of_Origin",0.0],'
+    'UNIT["Meter",1.0]]'
+)
+
+
+class SyntheticQuantity:
+    def __init__(self, quantity_id: str):
+        self.Id = quantity_id
+
+
+class SyntheticDateTime:
+    """Stand-in for System.DateTime - ticks are 100 ns intervals from 0001-01-01"""
+
+    def __init__(self, time: np.datetime64):
+        self.Ticks = int(time.astype("datetime64[ns]").astype(np.int64)) // 100 + 621355968000000000
+
+
+class SyntheticTimeData:
+    def __init__(self, values: np.ndarray):
+        self._values = values  # elements x time steps
+        self.NumberOfTimeSteps = values.shape[1]
+
+    def GetValue(self, time_step_index: int, element_index: int) -> float:
+        return float(self._values[element_index, time_step_index])
+
+
+class SyntheticDataItem:
+    def __init__(self, quantity_id: str, values: np.ndarray):
+        self.Quantity = SyntheticQuantity(quantity_id)
+        self.TimeData = SyntheticTimeData(values)
+        self.NumberOfElements = values.shape[0]
+        self._values = values
+
+    def CreateTimeSeriesData(self, element_index: int) -> np.ndarray:
+        return self._values[element_index].copy()  # .NET returns a new float array per call
+
+
+class SyntheticNode:
+    def __init__(self, node_id: str, x: float, y: float, bottom_level: float, data_items: List[SyntheticDataItem]):
+        self.Id = node_id
+        self.BottomLevel = bottom_level
+        self.DataItems = data_items
+        self._x = x
+        self._y = y
+
+    def get_XCoordinate(self) -> float:
+        return self._x
+
+    def get_YCoordinate(self) -> float:
+        return self._y
+
+
+class SyntheticGridPoint:
+    def __init__(self, chainage: float, point_type: int, x: float, y: float, z: float):
+        self.X = x
+        self.Y = y
+        self.Z = z
+        self._chainage = chainage
+        self._point_type = point_type
+
+    def get_Chainage(self) -> float:
+        return self._chainage
+
+    def get_PointType(self) -> int:
+        return self._point_type
+
+
+class SyntheticReach:
+    def __init__(self, reach_id: str, name: str, grid_points: List[SyntheticGridPoint], data_items: List[SyntheticDataItem]):
+        self.Id = reach_id
+        self.Name = name
+        self.GridPoints = grid_points
+        self.DataItems = data_items
+
+
+class SyntheticResultData:
+    """
+    Network of nodes and reaches with water level hydrographs - each reach alternates h-points and q-points so that
+    reach water level data items have one element per h-point as in MIKE 11 results
+    """
+
+    def __init__(
+        self,
+        number_of_nodes: int = 1000,
+        number_of_reaches: int = 100,
+        grid_points_per_reach: int = 21,
+        number_of_time_steps: int = 500,
+        seed: int = 0,
+        node_quantity: str = "WaterLevel",
+        reach_quantity: str = "Water Level",
+    ):
+        """
+        :param number_of_nodes: number of nodes
+        :param number_of_reaches: number of reaches
+        :param grid_points_per_reach: number of grid points along each reach - h-points and q-points alternate
+        :param number_of_time_steps: number of time steps of each time series
+        :param seed: random seed - the network is fixed by the sizes, the seed varies the water levels only
+        :param node_quantity: quantity id of node water levels - "WaterLevel" as in res1d/prf files
+        :param reach_quantity: quantity id of reach water levels - "Water Level" as in res11 files
+        """
+        self.ProjectionString = PROJECTION_STRING
+        self.StartTime = "2021-01-01 00:00:00"
+        self.EndTime = "2021-01-02 00:00:00"
+        self.NumberOfTimeSteps = number_of_time_steps
+        self.TimesList = [
+            SyntheticDateTime(time)
+            for time in np.datetime64("2021-01-01T00:00:00") + np.arange(number_of_time_steps) * np.timedelta64(60, "s")
+        ]
+        self.reach_quantity = reach_quantity
+
+        network = np.random.default_rng(number_of_nodes * 7919 + number_of_reaches)  # same network for every seed
+        levels = np.random.default_rng(seed)
+
+        x = 1570000.0 + network.random(number_of_nodes) * 20000.0
+        y = 5170000.0 + network.random(number_of_nodes) * 20000.0
+        bottom_levels = network.random(number_of_nodes) * 20.0
+        node_water_levels = self.get_hydrographs(levels, bottom_levels, number_of_time_steps)
+        self.Nodes = [
+            SyntheticNode(
+                f"SUMN.Junction.CCCGIS.{i}",
+                x[i].item(),
+                y[i].item(),
+                bottom_levels[i].item(),
+                [SyntheticDataItem(node_quantity, node_water_levels[i : i + 1])],
+            )
+            for i in range(number_of_nodes)
+        ]
+
+        self.Reaches = []
+        chainages = np.arange(grid_points_per_reach) * 12.5
+        point_types = np.where(np.arange(grid_points_per_reach) % 2 == 0, H_POINT, Q_POINT)
+        h_points = point_types == H_POINT
+        for r in range(number_of_reaches):
+            start_x, start_y = np.array([1570000.0, 5170000.0]) + network.random(2) * 20000.0
+            angle = network.random() * 2.0 * np.pi
+            grid_x = start_x + chainages * np.cos(angle)
+            grid_y = start_y + chainages * np.sin(angle)
+            grid_z = 20.0 * network.random() - chainages * 0.005
+            water_levels = self.get_hydrographs(levels, grid_z[h_points], number_of_time_steps)
+            name = f"SUMNSTM{r}"
+            self.Reaches.append(
+                SyntheticReach(
+                    f"{name}-1",
+                    name,
+                    [
+                        SyntheticGridPoint(
+                            chainages[i].item(), point_types[i].item(), grid_x[i].item(), grid_y[i].item(), grid_z[i].item()
+                        )
+                        for i in range(grid_points_per_reach)
+                    ],
+                    [SyntheticDataItem(reach_quantity, water_levels)],
+                )
+            )
+
+    @staticmethod
+    def get_hydrographs(generator: np.random.Generator, bottom_levels: np.ndarray, number_of_time_steps: int) -> np.ndarray:
+        """Single peaked hydrographs above the bottom levels - float32 as read from .NET"""
+        time_steps = np.arange(number_of_time_steps)
+        peaks = generator.random(len(bottom_levels)) * number_of_time_steps
+        widths = 5.0 + generator.random(len(bottom_levels)) * number_of_time_steps / 10.0
+        depths = generator.random(len(bottom_levels)) * 3.0
+        shape = np.exp(-(((time_steps[np.newaxis, :] - peaks[:, np.newaxis]) / widths[:, np.newaxis]) ** 2))
+        return (bottom_levels[:, np.newaxis] + depths[:, np.newaxis] * shape).astype(np.float32)
+
+    def to_data_frame(self, time_index: Optional[pd.Index] = None) -> pd.DataFrame:
+        """
+        Reach water levels as read by Res1DReader.read_quantities - columns are named quantity:reach:chainage
+        :param time_index: index of the DataFrame - defaults to the time step number
+        :return: DataFrame of time series indexed by time
+        """
+        columns = {}
+        for reach in self.Reaches:
+            chainages = [grid_point.get_Chainage() for grid_point in reach.GridPoints if grid_point.get_PointType() == H_POINT]
+            values = reach.DataItems[0]._values
+            for element_index, chainage in enumerate(chainages):
+                columns[f"{self.reach_quantity}:{reach.Name}:{chainage:.3f}"] = values[element_index]
+        df = pd.DataFrame(columns, index=time_index if time_index is not None else pd.RangeIndex(self.NumberOfTimeSteps))
+        return df.reindex(sorted(df.columns), axis=1)
+
+
+if __name__ == "__main__":
+    pass
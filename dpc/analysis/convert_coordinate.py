@@ -10,7 +10,10 @@ Created on 2021-12-04
 @email: edmund.bennett@ghd.com
 """
 
-from pyproj import Proj, transform
+from typing import Tuple
+from functools import lru_cache
+import numpy as np
+from pyproj import Proj, Transformer, transform
 
 from dpc.utils.logger import logger as log
 
@@ -25,5 +28,41 @@ def convert_coordinate(
     return transform(from_crs, to_crs, x, y)
 
 
+@lru_cache(maxsize=None)
+def get_transformer(
+    from_crs: str,
+    to_crs: str,
+) -> Transformer:
+    """
+    Gets transformer between coordinate reference systems - cached so that the pipeline is only set up once per pair
+    :param from_crs: i.e. epsg:27200
+    :param to_crs: i.e. epsg:4326
+    :return: transformer taking and returning coordinates in x, y (longitude, latitude) order
+    """
+    log.debug(f"Creating transformer from {from_crs} to {to_crs}")
+    return Transformer.from_crs(from_crs, to_crs, always_xy=True)
+
+
+def convert_coordinates(
+    from_crs: str,
+    to_crs: str,
+    x: np.ndarray,
+    y: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Converts arrays of coordinates in a single call
+    :param from_crs: i.e. epsg:27200
+    :param to_crs: i.e. epsg:4326
+    :param x: x coordinates (or longitudes)
+    :param y: y coordinates (or latitudes)
+    :return: converted x and y coordinates (or longitudes and latitudes)
+    """
+    log.debug("Calling convert_coordinates")
+    return get_transformer(from_crs, to_crs).transform(
+        np.asarray(x, dtype=np.float64),
+        np.asarray(y, dtype=np.float64),
+    )
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,152 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Ensemble analysis of batches of design storm runs named by AEP, duration and temporal pattern i.e.
+V03_SUMN_PostEQ_ED2014_00p5AEP_03hr.PRF or V03_SUMN_PostEQ_ED2014_05AEP_18hrT.PRF. For each AEP the maximum water levels
+of the temporal patterns of each duration are reduced to a single level (the median by default) and the critical
+duration is the duration giving the highest of these levels.
+"""
+
+from typing import List, Dict, Optional
+from os.path import split
+import re
+import warnings
+import numpy as np
+
+from dpc.utils.logger import logger as log
+
+# named groups: aep and duration are required, unit (hr, h, min or m - hours if absent) and pattern are optional
+# "p" is read as a decimal point i.e. 00p5AEP is 0.5% AEP
+FILENAME_REGEX = r"(?P<aep>\d+(?:p\d+)?)AEP_(?P<duration>\d+(?:p\d+)?)(?P<unit>hr|h|min|m)(?P<pattern>[A-Za-z0-9]*)"
+ENSEMBLE_STATISTICS = {  # NaN ignoring reduction and the faster reduction used where there are no NaN
+    "median": (np.nanmedian, np.median),
+    "mean": (np.nanmean, np.mean),
+    "max": (np.nanmax, np.max),
+    "min": (np.nanmin, np.min),
+}
+
+
+def get_number(text: str) -> float:
+    return float(text.lower().replace("p", "."))
+
+
+def parse_file_name(
+    file_name: str,
+    filename_regex: str = FILENAME_REGEX,
+) -> Optional[Dict[str, any]]:
+    """
+    Gets AEP, duration and temporal pattern of a design storm run from its file name
+    :param file_name: name or path of file
+    :param filename_regex: regular expression with named groups aep and duration and optionally unit and pattern
+    :return: {"aep", "aep_percent", "duration", "duration_minutes", "pattern"} - None if the name does not match
+    """
+    match = re.search(filename_regex, split(file_name)[-1], flags=re.IGNORECASE)
+    if match is None:
+        return None
+    groups = match.groupdict()
+    unit = (groups.get("unit") or "hr").lower()
+    duration = groups["duration"] + (groups.get("unit") or "")
+    return {
+        "aep": f"{get_number(groups['aep']):g}",
+        "aep_percent": get_number(groups["aep"]),
+        "duration": duration,
+        "duration_minutes": get_number(groups["duration"]) * (1.0 if unit in ["min", "m"] else 60.0),
+        "pattern": groups.get("pattern") or "",
+    }
+
+
+def fill_critical_durations(
+    file_paths: List[str],
+    critical_durations: List[Optional[str]],
+    filename_regex: str = FILENAME_REGEX,
+) -> List[Optional[str]]:
+    """
+    Takes the critical duration of files without one from their file names
+    :param file_paths: paths of files
+    :param critical_durations: critical duration of each file - None where not given
+    :param filename_regex: regular expression with named groups aep and duration and optionally unit and pattern
+    :return: critical duration of each file - given durations are kept
+    """
+    filled_durations = []
+    for file_path, critical_duration in zip(file_paths, critical_durations):
+        if critical_duration is None and file_path:
+            event = parse_file_name(file_path, filename_regex)
+            if event is not None:
+                critical_duration = event["duration"]
+        filled_durations.append(critical_duration)
+    filled_count = sum(a is None and b is not None for a, b in zip(critical_durations, filled_durations))
+    if filled_count:
+        log.info(f"Critical durations of {filled_count} files taken from file names")
+    return filled_durations
+
+
+def get_ensemble(
+    values: np.ndarray,
+    file_names: List[str],
+    statistic: str = "median",
+    filename_regex: str = FILENAME_REGEX,
+) -> List[Dict[str, any]]:
+    """
+    Reduces the temporal patterns of each AEP and duration and finds the critical duration of each AEP - each reduction
+    is over all nodes at once so the work per node is independent of the number of files
+    :param values: maximum water levels of shape (nodes, files) with NaN where not available
+    :param file_names: name of the file of each column of values
+    :param statistic: reduction over temporal patterns - one of median, mean, max or min
+    :param filename_regex: regular expression with named groups aep and duration and optionally unit and pattern
+    :return: for each AEP from most to least frequent {"aep", "durations", "pattern_counts", "levels" (nodes x durations),
+        "critical_levels" (nodes), "critical_durations" (index into durations of each node, -1 where no level)}
+    """
+    if statistic not in ENSEMBLE_STATISTICS:
+        raise ValueError(f"Unknown ensemble statistic: {statistic} - use one of {', '.join(ENSEMBLE_STATISTICS)}")
+    reduce_ignoring_nan, reduce = ENSEMBLE_STATISTICS[statistic]
+
+    events = {}  # {aep_percent: {duration_minutes: (aep, duration, [columns])}}
+    unmatched = []
+    for j, file_name in enumerate(file_names):
+        event = parse_file_name(file_name, filename_regex)
+        if event is None:
+            unmatched.append(file_name)
+            continue
+        aep_events = events.setdefault(event["aep_percent"], {})
+        aep_events.setdefault(event["duration_minutes"], (event["aep"], event["duration"], []))[2].append(j)
+    if unmatched:
+        log.warning(f"{len(unmatched)} files are not named by AEP and duration and are left out of the ensemble i.e. {unmatched[0]}")
+
+    ensemble = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # all NaN where a node is in none of the patterns
+        for aep_percent in sorted(events, reverse=True):
+            durations = [events[aep_percent][duration_minutes] for duration_minutes in sorted(events[aep_percent])]
+            levels = np.column_stack([
+                reduce_ignoring_nan(patterns, axis=1) if np.isnan(patterns).any() else reduce(patterns, axis=1)
+                for patterns in (values[:, columns] for _, _, columns in durations)
+            ])
+            has_levels = ~np.isnan(levels).all(axis=1)
+            critical_levels = np.full(len(levels), np.nan)
+            critical_durations = np.full(len(levels), -1, dtype=np.int64)
+            if has_levels.any():
+                critical_levels[has_levels] = np.nanmax(levels[has_levels], axis=1)
+                critical_durations[has_levels] = np.nanargmax(levels[has_levels], axis=1)
+            ensemble.append({
+                "aep": durations[0][0],
+                "durations": [duration for _, duration, _ in durations],
+                "pattern_counts": [len(columns) for _, _, columns in durations],
+                "levels": levels,
+                "critical_levels": critical_levels,
+                "critical_durations": critical_durations,
+            })
+            log.debug(f"Ensemble of {durations[0][0]}% AEP over {len(durations)} durations")
+
+    return ensemble
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,104 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Dict, Tuple
+from math import floor, hypot
+import numpy as np
+
+from dpc.extraction.node_results import NodeResults
+from dpc.utils.logger import logger as log
+
+
+def get_spatial_join(
+    data: NodeResults,
+    tolerance: float,
+) -> np.ndarray:
+    """
+    Matches nodes of each file to the nearest node of previous files within a distance tolerance using a grid index
+    with cells the size of the tolerance - each lookup searches the 3 x 3 cells around a node. Nodes of the same file
+    are never merged with each other and each node of a previous file is merged with at most one node of a file.
+    :param data: node results - files are matched in the order they were appended
+    :param tolerance: maximum distance between merged nodes in the units of the node coordinates
+    :return: code of the node each node is merged into - its own code where it is not merged
+    """
+    log.debug("Calling get_spatial_join")
+    if not tolerance > 0:
+        raise ValueError(f"Spatial join tolerance must be greater than 0: {tolerance}")
+    node_codes = data.node_codes
+    file_codes = data.file_codes
+    xs, ys = data.column("x"), data.column("y")
+
+    merged_codes = np.full(len(data.node_ids), -1, dtype=np.int64)
+    node_xs, node_ys = np.full(len(data.node_ids), np.nan), np.full(len(data.node_ids), np.nan)
+    grid: Dict[Tuple[int, int], List[int]] = {}
+
+    rows_by_file = np.argsort(file_codes, kind="stable")
+    file_starts = np.searchsorted(file_codes[rows_by_file], np.arange(len(data.files) + 1))
+    for file_code in range(len(data.files)):
+        rows = rows_by_file[file_starts[file_code]:file_starts[file_code + 1]]
+        file_node_codes = node_codes[rows].tolist()
+        used = {merged_codes[node_code] for node_code in file_node_codes if merged_codes[node_code] >= 0}
+
+        for node_code, x, y in zip(file_node_codes, xs[rows].tolist(), ys[rows].tolist()):
+            if merged_codes[node_code] >= 0:  # node id seen in a previous file
+                continue
+            if np.isnan(x) or np.isnan(y):
+                merged_codes[node_code] = node_code
+                used.add(node_code)
+                continue
+
+            cell_x, cell_y = floor(x / tolerance), floor(y / tolerance)
+            nearest_code, nearest_distance = -1, tolerance
+            for neighbour_x in (cell_x - 1, cell_x, cell_x + 1):
+                for neighbour_y in (cell_y - 1, cell_y, cell_y + 1):
+                    for candidate_code in grid.get((neighbour_x, neighbour_y), []):
+                        if candidate_code in used:
+                            continue
+                        distance = hypot(node_xs[candidate_code] - x, node_ys[candidate_code] - y)
+                        if distance < nearest_distance or (distance == nearest_distance and nearest_code < 0):
+                            nearest_code, nearest_distance = candidate_code, distance
+
+            if nearest_code < 0:
+                merged_codes[node_code] = node_code
+                node_xs[node_code], node_ys[node_code] = x, y
+                grid.setdefault((cell_x, cell_y), []).append(node_code)
+            else:
+                merged_codes[node_code] = nearest_code
+            used.add(merged_codes[node_code])
+
+    unmatched = merged_codes < 0  # nodes without rows
+    merged_codes[unmatched] = np.flatnonzero(unmatched)
+    return merged_codes
+
+
+def spatial_join(
+    data: NodeResults,
+    tolerance: float,
+) -> int:
+    """
+    Merges nodes of different files within a distance tolerance into a single node i.e. a PRF node and the res11 grid
+    point at the same location - the id of the node of the earliest file is kept
+    :param data: node results - modified in place
+    :param tolerance: maximum distance between merged nodes in the units of the node coordinates
+    :return: number of nodes merged
+    """
+    log.info(f"Joining nodes of different files within {tolerance} of each other")
+    merged_codes = get_spatial_join(data, tolerance)
+    merge_count = int(np.count_nonzero(merged_codes != np.arange(len(merged_codes))))
+    if merge_count:
+        data.merge_nodes(merged_codes)
+    log.info(f"Merged {merge_count} nodes")
+    return merge_count
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,156 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Reduces water level time series to a set of statistics in one call per array of series. Statistics are named:
+    max             maximum water level
+    min             minimum water level
+    mean            mean water level
+    last_argmax     timestep of the last occurrence of the maximum water level
+    pNN             NNth percentile of water level i.e. p95, p99.9
+    time_above_D    hours with depth above D i.e. time_above_0.5 - depth is water level above invert level
+    depth_integral  integral over time of depth above invert level - metre hours
+Time above a depth and the depth integral weight each sample by half the interval to each neighbouring sample so that
+they do not depend on the interval at which results were saved.
+"""
+
+from typing import List, Dict, Optional
+import re
+import numpy as np
+
+from dpc.utils.logger import logger as log
+
+DEFAULT_STATISTICS = ["max", "last_argmax"]  # always computed - these make up the primary outputs
+SIMPLE_STATISTICS = ["max", "min", "mean", "last_argmax", "depth_integral"]
+PERCENTILE_REGEX = r"^p(\d+(\.\d+)?)$"
+TIME_ABOVE_REGEX = r"^time_above_(\d+(\.\d+)?)$"
+OUTPUT_COLUMNS = {  # output column of statistics keeping the names used before statistics were configurable
+    "max": "max_water_level",
+    "last_argmax": "max_water_level_timing",
+}
+
+
+def validate_statistics(statistics: Optional[List[str]]) -> List[str]:
+    """
+    Checks statistic names and adds the default statistics
+    :param statistics: names of statistics i.e. ["p95", "time_above_0.5"]
+    :return: default statistics followed by the requested statistics without duplicates
+    """
+    statistics = list(dict.fromkeys(DEFAULT_STATISTICS + list(statistics or [])))
+    for statistic in statistics:
+        if (
+            statistic not in SIMPLE_STATISTICS
+            and re.match(PERCENTILE_REGEX, statistic) is None
+            and re.match(TIME_ABOVE_REGEX, statistic) is None
+        ):
+            raise ValueError(f"Unknown statistic: {statistic}")
+        if re.match(PERCENTILE_REGEX, statistic) is not None and float(statistic[1:]) > 100:
+            raise ValueError(f"Percentile must be between 0 and 100: {statistic}")
+    return statistics
+
+
+def get_output_column(statistic: str) -> str:
+    """
+    Gets name of the output column of a statistic
+    :param statistic: name of statistic i.e. p95
+    :return: column name i.e. p95_water_level
+    """
+    if statistic in OUTPUT_COLUMNS:
+        return OUTPUT_COLUMNS[statistic]
+    if statistic in ["min", "mean"] or re.match(PERCENTILE_REGEX, statistic) is not None:
+        return f"{statistic}_water_level"
+    return statistic
+
+
+def is_integer_statistic(statistic: str) -> bool:
+    return statistic == "last_argmax"
+
+
+def is_depth_statistic(statistic: str) -> bool:
+    return statistic == "depth_integral" or re.match(TIME_ABOVE_REGEX, statistic) is not None
+
+
+def get_time_step_durations(times: np.ndarray) -> np.ndarray:
+    """
+    Gets the length of time represented by each sample of a series - half the interval to each neighbouring sample, as
+    per the trapezoidal rule, so that the durations sum to the time from the first to the last sample
+    :param times: datetime64 time of each sample
+    :return: duration of each sample in hours - zero where there is a single sample
+    """
+    intervals = np.diff(times).astype("timedelta64[ns]").astype(np.int64) / 3.6e12
+    durations = np.zeros(len(times))
+    durations[:-1] += intervals / 2
+    durations[1:] += intervals / 2
+    return durations
+
+
+def reduce_time_series(
+    values: np.ndarray,
+    statistics: List[str],
+    axis: int = -1,
+    invert_levels: np.ndarray = None,
+    durations: np.ndarray = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Computes statistics of each series of an array in memory - the array is read from .NET once for all statistics
+    :param values: array of water level series i.e. series x timesteps
+    :param statistics: names of statistics
+    :param axis: time axis of values
+    :param invert_levels: invert level of each series - required for depth statistics, NaN gives NaN
+    :param durations: duration in hours of each timestep i.e. output by get_time_step_durations - required for depth
+        statistics
+    :return: {statistic: array with one value per series} - NaN where there are no timesteps
+    """
+    log.debug(f"Reducing {values.shape} time series to: {statistics}")
+    values = np.moveaxis(values, axis, -1)
+    series_count = values.shape[0]
+    if values.shape[-1] == 0:  # i.e. a time window outside the simulation period
+        return {statistic: np.full(series_count, np.nan) for statistic in statistics}
+    results = {}
+
+    maxima = None
+    if "max" in statistics or "last_argmax" in statistics:
+        maxima = values.max(axis=-1)
+    if "max" in statistics:
+        results["max"] = maxima
+    if "last_argmax" in statistics:
+        matches = np.flip(values == maxima[:, np.newaxis], axis=-1)
+        results["last_argmax"] = values.shape[-1] - 1 - np.argmax(matches, axis=-1)
+    if "min" in statistics:
+        results["min"] = values.min(axis=-1)
+    if "mean" in statistics:
+        results["mean"] = values.mean(axis=-1, dtype=np.float64)
+
+    percentiles = [statistic for statistic in statistics if re.match(PERCENTILE_REGEX, statistic) is not None]
+    if percentiles:
+        percentile_values = np.percentile(values, [float(statistic[1:]) for statistic in percentiles], axis=-1)
+        results.update(zip(percentiles, percentile_values))
+
+    depth_statistics = [statistic for statistic in statistics if is_depth_statistic(statistic)]
+    if depth_statistics:
+        if durations is None:
+            raise ValueError(f"Durations of timesteps are required for statistics: {depth_statistics}")
+        durations = np.asarray(durations, dtype=np.float64)
+        if invert_levels is None:
+            invert_levels = np.full(series_count, np.nan)
+        depths = values - np.asarray(invert_levels, dtype=np.float64)[:, np.newaxis]
+        has_invert_level = ~np.isnan(invert_levels)
+        for statistic in depth_statistics:
+            if statistic == "depth_integral":
+                result = np.clip(depths, 0.0, None) @ durations
+            else:
+                result = (depths > float(statistic[len("time_above_"):])) @ durations
+            results[statistic] = np.where(has_invert_level, result, np.nan)
+
+    return results
+
+
+if __name__ == "__main__":
+    pass
@@ -10,78 +10,120 @@ Created on 2021-10-27
 @email: edmund.bennett@ghd.com
 """
 
+import numpy as np
 import pandas as pd
-from mikeio1d.res1d import ResultData
-from typing import Dict, Tuple, Callable
-
+from typing import Dict, List, Tuple, Callable, Container, Optional, Union
+
+try:
+    from mikeio1d.res1d import ResultData
+    from mikeio1d.dotnet import asNumpyArray
+except ImportError:  # MIKE .NET libraries unavailable i.e. benchmarking against synthetic result data on Linux
+    ResultData = any
+    asNumpyArray = np.asarray
+
+from dpc.analysis.time_series_statistics import (
+    reduce_time_series,
+    validate_statistics,
+    get_output_column,
+    is_integer_statistic,
+    is_depth_statistic,
+    get_time_step_durations,
+)
+from dpc.extraction.subset import filter_geometry, get_subset_reach_ids
+from dpc.extraction.time_window import get_result_times
 from dpc.utils.logger import logger as log
 
+CHAINAGE_TOLERANCE = 0.1  # maximum distance down a reach between a grid point and the water level point matched to it
+
 
 def get_data(
     data: ResultData,
-    df: pd.DataFrame = None,
+    df: Union[pd.DataFrame, Callable[[Optional[List[str]]], pd.DataFrame]] = None,
     include_nodes: bool = True,
     include_reaches: bool = True,
+    chainage_tolerance: float = CHAINAGE_TOLERANCE,
+    statistics: List[str] = None,
+    time_steps: np.ndarray = None,
+    subset_ids: List[str] = None,
+    subset_regex: str = None,
+    subset_bbox: List[float] = None,
+    times: np.ndarray = None,
 ) -> Tuple[Dict[str, any], str]:
+    """
+    Gets location, invert level and water level statistics of every node
+    :param data: result data
+    :param df: DataFrame of water level time series - reach grid points are matched to its columns by chainage. A
+        function reading the DataFrame of given reach ids i.e. as returned by load_res_file is called once the subset
+        is known, so that only the time series of reaches in the subset are read
+    :param include_nodes: include nodes
+    :param include_reaches: include h-points and interpolated h-points of reaches
+    :param chainage_tolerance: maximum distance down a reach to the nearest water level point of a grid point
+    :param statistics: statistics of water level in addition to max and last_argmax i.e. ["p95", "time_above_0.5"]
+    :param time_steps: original index of the time steps to reduce i.e. output by get_time_step_index - None for all,
+        timings are given as original time steps
+    :param subset_ids: node, grid point or reach ids to extract - None extracts every id
+    :param subset_regex: regular expression searched for in the ids to extract - None extracts every id
+    :param subset_bbox: xmin, ymin, xmax, ymax of the nodes and grid points to extract - None extracts every point
+    :param times: time of each time step of the result data i.e. output by get_result_times - read where required if
+        not given
+    :return: values of each node and projection
+    """
     log.debug("Calling get_data")
 
     all_node_data = {}
 
     projection = get_projection(data)
 
-    start_time, end_time, number_of_time_steps = get_timing_data(
-        data,
-    )
-
-    node_x_coordinates = get_node_coordinates(
-        data,
-        "x",
-        include_nodes=include_nodes,
-        include_reaches=include_reaches,
-    )
-    node_y_coordinates = get_node_coordinates(
-        data,
-        "y",
-        include_nodes=include_nodes,
-        include_reaches=include_reaches,
-    )
-    node_invert_levels = get_node_invert_levels(
-        data,
-        df=df,
-        include_nodes=include_nodes,
-        include_reaches=include_reaches,
-    )
-    max_water_levels, max_water_level_timings = get_aggregated_water_levels(
+    geometry = get_network_geometry(
         data,
-        max,
         include_nodes=include_nodes,
         include_reaches=include_reaches,
-        df=df,
-    )
-
-    node_ids = set(  # construct list of nodes
-        list(node_x_coordinates.keys())
     )
-
-    for node_id in node_ids:
-        max_water_level = None
-        if node_id in max_water_levels.keys():
-            max_water_level = max_water_levels[node_id]
-        else:
-            tolerance = 0.1
-            # TODO: match within a distance threshold down the reach
-
-        max_water_level_timing = None
-        if node_id in max_water_level_timings.keys():
-            max_water_level_timing = max_water_level_timings[node_id]
-
+    geometry = filter_geometry(geometry, ids=subset_ids, id_regex=subset_regex, bbox=subset_bbox)  # before reduction
+    statistics = validate_statistics(statistics)
+    durations = None
+    if any(is_depth_statistic(statistic) for statistic in statistics):  # weighted by the length of each time step
+        if times is None:
+            times = get_result_times(data)
+        # durations between the selected time steps - with a stride each sample stands for stride time steps
+        durations = get_time_step_durations(times if time_steps is None else times[time_steps])
+    if callable(df):  # only reaches of the subset are read
+        df = df(get_subset_reach_ids(geometry))
+    if df is not None:  # reach grid points are matched to the nearest water level point by chainage
+        node_statistics = get_matched_water_level_statistics(
+            geometry,
+            df,
+            statistics,
+            tolerance=chainage_tolerance,
+            time_steps=time_steps,
+            durations=durations,
+        )
+    else:
+        node_statistics = get_water_level_statistics(
+            data,
+            geometry,
+            statistics,
+            include_nodes=include_nodes,
+            include_reaches=include_reaches,
+            time_steps=time_steps,
+            durations=durations,
+        )
+
+    output_columns = [get_output_column(statistic) for statistic in statistics]
+    for i, (node_id, x, y, invert_level) in enumerate(zip(
+        geometry["node_id"].tolist(),
+        geometry["x"].tolist(),
+        geometry["y"].tolist(),
+        geometry["invert_level"].tolist(),
+    )):
         all_node_data[node_id] = {
-            "x": node_x_coordinates[node_id],
-            "y": node_y_coordinates[node_id],
-            "invert_level": node_invert_levels[node_id] if node_id in node_invert_levels.keys() else None,
-            "max_water_level": max_water_level,
-            "max_water_level_timing": max_water_level_timing,
+            "x": x,
+            "y": y,
+            "invert_level": invert_level,
         }
+        all_node_data[node_id].update(
+            (column, node_statistics[statistic][i]) for column, statistic in zip(output_columns, statistics)
+        )
 
     return all_node_data, projection
 
@@ -91,77 +133,105 @@ def get_projection(data: ResultData) -> str:
     return data.ProjectionString
 
 
-def get_timing_data(data: ResultData) -> Tuple[str, str, str]:
-    return data.StartTime, data.EndTime, data.NumberOfTimeSteps
-
-
-def get_node_coordinates(
+def get_timing_data(
+    data: ResultData,
+    times: np.ndarray = None,
+) -> Tuple[Optional[np.datetime64], Optional[np.datetime64], int]:
+    """
+    Gets start time, end time and number of time steps of result data
+    :param data: result data
+    :param times: time of each time step i.e. output by get_result_times - read from the result data if not given
+    :return: start time, end time and number of time steps - times are datetime64[ns], None if there are no time steps
+    """
+    if times is None:
+        times = get_result_times(data)
+    if not len(times):
+        return None, None, 0
+    return times[0], times[-1], len(times)
+
+
+def format_grid_point_id(reach_id: str, chainage: float) -> str:
+    """
+    Formats the id of a reach grid point i.e. "SUMN.SUMNSTM 281.5"
+    :param reach_id: id of reach
+    :param chainage: chainage of grid point
+    :return: grid point id
+    """
+    chainage = round(chainage, 1) if "." in str(chainage) else f"{chainage}.0"
+    return f"{reach_id} {chainage}"
+
+
+def get_network_geometry(
     data: ResultData,
-    coordinate: str,
-    df: pd.DataFrame = None,
     include_nodes: bool = True,
     include_reaches: bool = True,
-) -> Dict[str, float]:
-    log.debug("Calling get_node_coordinates")
-    coordinates = {}
+) -> pd.DataFrame:
+    """
+    Gets location and invert level of every node and reach h-point in a single pass over the network
+    :param data: result data
+    :param include_nodes: include nodes
+    :param include_reaches: include h-points and interpolated h-points of reaches
+    :return: DataFrame with columns node_id, reach_id, chainage, x, y, invert_level and point_type - one row per node
+    """
+    log.debug("Calling get_network_geometry")
+    node_ids, reach_ids, chainages, xs, ys, invert_levels, point_types = [], [], [], [], [], [], []
 
     if hasattr(data, "Nodes") and include_nodes:
-        nodes = list(data.Nodes)
-        if df is None:
-            log.debug(f"Attempting to take data direct from data structure")
-            for node in nodes:
-                coord = None
-                if coordinate == "x":
-                    coord = node.get_XCoordinate()
-                elif coordinate == "y":
-                    coord = node.get_YCoordinate()
-                else:
-                    log.error(f"Spatial coordinate not property specified. Got: {coordinate}")
-                coordinates[node.Id] = coord
-        else:
-            log.debug(f"Attempting to take data from relevant reach via DataFrame")
-            relevant_columns = [col for col in df.columns if "Water Level" in col or "WaterLevel" in col]
-            for col in relevant_columns:
-                node_id, chainage = col.split(":")[1:]
-                node = [node for node in nodes if node.Id == f"{chainage} {node_id}"]
-                if node:
-                    matched_node = node[0]
-                    grid_point_index = matched_node.Reaches[0].Reach.GridPointIndexForChainage(chainage)
-                    coord = None
-                    if coordinate == "x":
-                        coord = list(matched_node.Reaches[0].Reach.GridPoints)[grid_point_index].get_X()
-                    elif coordinate == "y":
-                        coord = list(matched_node.Reaches[0].Reach.GridPoints)[grid_point_index].get_Y()
-                    else:
-                        log.error(f"Spatial coordinate not property specified. Got: {coordinate}")
-                    chainage = round(chainage, 1) if "." in str(chainage) else f"{chainage}.0"
-                    coordinates[f"{node_id} {chainage}"] = coord
+        for node in list(data.Nodes):
+            node_ids.append(node.Id)
+            reach_ids.append(None)
+            chainages.append(np.nan)
+            xs.append(node.get_XCoordinate())
+            ys.append(node.get_YCoordinate())
+            invert_levels.append(node.BottomLevel)
+            point_types.append(None)
 
     if hasattr(data, "Reaches") and include_reaches:
-        reaches = list(data.Reaches)
-        for reach in reaches:
+        for reach in list(data.Reaches):
             try:
-                reach_id = reach.Id
-                if "-" in reach_id:
-                    reach_id = reach_id.split("-")[0]
-                grid_points = list(reach.GridPoints)
-                if grid_points:
-                    for grid_point in grid_points:
-                        if grid_point.get_PointType() in [2, 1025]:  # h-point is 1025, interpolated h-point is 2
-                            chainage = grid_point.get_Chainage()
-                            log.debug(f"get_node_coordinates - Reach: {reach_id} chainage: {grid_point.get_Chainage()} has point type: {grid_point.get_PointType()}")
-                            chainage = round(chainage, 1) if "." in str(chainage) else f"{chainage}.0"
-                            full_grid_point_id = f"{reach_id} {chainage}"
-                            result = None
-                            if coordinate == "x":
-                                result = grid_point.X
-                            elif coordinate == "y":
-                                result = grid_point.Y
-                            coordinates[full_grid_point_id] = result
+                reach_id = reach.Id.split("-")[0]  # drop anything after a "-"
+                for grid_point in list(reach.GridPoints):
+                    point_type = grid_point.get_PointType()
+                    if point_type in [2, 1025]:  # h-point is 1025, interpolated h-point is 2
+                        chainage = grid_point.get_Chainage()
+                        log.debug(f"get_network_geometry - Reach: {reach_id} chainage: {chainage} has point type: {point_type}")
+                        node_ids.append(format_grid_point_id(reach_id, chainage))
+                        reach_ids.append(reach_id)
+                        chainages.append(chainage)
+                        xs.append(grid_point.X)
+                        ys.append(grid_point.Y)
+                        invert_levels.append(grid_point.Z)
+                        point_types.append(point_type)
             except:
                 log.warning(f"Bottom level data not available for reach: {reach.Id}")
 
-    return coordinates
+    geometry = pd.DataFrame(
+        {
+            "node_id": node_ids,
+            "reach_id": reach_ids,
+            "chainage": np.array(chainages, dtype=np.float64),
+            "x": np.array(xs, dtype=np.float64),
+            "y": np.array(ys, dtype=np.float64),
+            "invert_level": np.array(invert_levels, dtype=np.float64),
+            "point_type": pd.array(point_types, dtype="Int64"),
+        }
+    )
+    return geometry.drop_duplicates(subset="node_id", keep="last")  # grid points rounding to the same id
+
+
+def get_node_coordinates(
+    data: ResultData,
+    coordinate: str,
+    df: pd.DataFrame = None,
+    include_nodes: bool = True,
+    include_reaches: bool = True,
+) -> Dict[str, float]:
+    log.debug("Calling get_node_coordinates")
+    if coordinate not in ["x", "y"]:
+        log.error(f"Spatial coordinate not property specified. Got: {coordinate}")
+        return {}
+    geometry = get_network_geometry(data, include_nodes=include_nodes, include_reaches=include_reaches)
+    return dict(zip(geometry["node_id"].tolist(), geometry[coordinate].tolist()))
 
 
 def get_node_invert_levels(
@@ -171,46 +241,257 @@ def get_node_invert_levels(
     include_reaches: bool = True,
 ) -> Dict[str, float]:
     log.debug("Calling get_node_invert_levels")
-    invert_levels = {}
+    geometry = get_network_geometry(data, include_nodes=include_nodes, include_reaches=include_reaches)
+    return dict(zip(geometry["node_id"].tolist(), geometry["invert_level"].tolist()))
+
+
+def get_chainage_index(columns: List[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Indexes water level columns by reach and chainage - columns are named quantity:reach:chainage as per Res1D.read_all
+    :param columns: names of water level columns
+    :return: {reach_id: (sorted chainages, position in columns of each chainage)}
+    """
+    reach_chainages: Dict[str, Tuple[List[float], List[int]]] = {}
+    for position, column in enumerate(columns):
+        names = column.split(":")
+        if len(names) < 3:
+            continue
+        try:
+            chainage = float(names[2])
+        except ValueError:
+            continue
+        chainages, positions = reach_chainages.setdefault(names[1], ([], []))
+        chainages.append(chainage)
+        positions.append(position)
+
+    chainage_index = {}
+    for reach_id, (chainages, positions) in reach_chainages.items():
+        order = np.argsort(chainages, kind="stable")
+        chainage_index[reach_id] = (np.asarray(chainages)[order], np.asarray(positions, dtype=np.int64)[order])
+    return chainage_index
+
+
+def match_chainages(
+    chainage_index: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    reach_ids: np.ndarray,
+    chainages: np.ndarray,
+    tolerance: float = CHAINAGE_TOLERANCE,
+) -> np.ndarray:
+    """
+    Matches each grid point to the nearest indexed chainage of its reach - a binary search of each reach
+    :param chainage_index: index output by get_chainage_index
+    :param reach_ids: reach of each grid point
+    :param chainages: chainage of each grid point
+    :param tolerance: maximum distance to the matched chainage
+    :return: position of the matched column of each grid point - -1 where there is no chainage within the tolerance
+    """
+    matches = np.full(len(chainages), -1, dtype=np.int64)
+    for reach_id in pd.unique(reach_ids):
+        if reach_id not in chainage_index:
+            continue
+        indexed_chainages, positions = chainage_index[reach_id]
+        rows = np.flatnonzero(reach_ids == reach_id)
+        reach_chainages = chainages[rows]
+        right = np.clip(np.searchsorted(indexed_chainages, reach_chainages), 1, len(indexed_chainages) - 1)
+        left = right - 1
+        if len(indexed_chainages) == 1:
+            left = right = np.zeros(len(rows), dtype=np.int64)
+        nearest = np.where(
+            np.abs(reach_chainages - indexed_chainages[left]) <= np.abs(indexed_chainages[right] - reach_chainages),
+            left,
+            right,
+        )
+        within = np.abs(indexed_chainages[nearest] - reach_chainages) <= tolerance
+        matches[rows[within]] = positions[nearest[within]]
+    return matches
+
+
+def to_original_time_steps(
+    timings: np.ndarray,
+    time_steps: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Maps timesteps of the selected time steps back to timesteps of the result file
+    :param timings: index into the selected time steps
+    :param time_steps: original index of each selected time step - None where every time step is selected
+    :return: original timesteps
+    """
+    if time_steps is None or not len(time_steps):  # no timings where no time step is selected
+        return timings
+    return time_steps[timings]
+
+
+def get_statistic_values(
+    results: Dict[str, np.ndarray],
+    statistic: str,
+    rows: np.ndarray = None,
+) -> List[any]:
+    """
+    Converts reduced values to a list - None where a value is not available, int for timesteps
+    :param results: reduced values of each statistic as output by reduce_time_series
+    :param statistic: name of statistic
+    :param rows: position in the reduced values of each output row - -1 where there is no value
+    :return: value of each output row
+    """
+    values = results[statistic].astype(np.float64)
+    if rows is not None:
+        values = np.where(rows >= 0, values[np.maximum(rows, 0)] if len(values) else np.nan, np.nan)
+    as_integer = is_integer_statistic(statistic)
+    return [None if np.isnan(value) else int(value) if as_integer else value for value in values.tolist()]
+
+
+def get_water_level_statistics(
+    data: ResultData,
+    geometry: pd.DataFrame,
+    statistics: List[str],
+    include_nodes: bool = True,
+    include_reaches: bool = True,
+    time_steps: np.ndarray = None,
+    durations: np.ndarray = None,
+) -> Dict[str, List[any]]:
+    """
+    Reduces node water level time series read from result data - each series is read from .NET once for all statistics
+    :param data: result data
+    :param geometry: network geometry output by get_network_geometry
+    :param statistics: names of statistics
+    :param include_nodes: include node data items
+    :param include_reaches: include reach data items - only max and last_argmax are available for reaches, by reach id
+    :param time_steps: original index of the time steps to reduce - None for all
+    :param durations: duration in hours of each reduced time step - required for depth statistics
+    :return: {statistic: value of each geometry row}
+    """
+    log.debug("Calling get_water_level_statistics")
+    node_statistics = {statistic: [None] * len(geometry) for statistic in statistics}
+    geometry_rows = {node_id: i for i, node_id in enumerate(geometry["node_id"].tolist())}
 
     if hasattr(data, "Nodes") and include_nodes:
-        nodes = list(data.Nodes)
-        if df is None:
-            log.debug(f"Attempting to take data direct from data structure")
-            for node in nodes:
-                invert_levels[node.Id] = node.BottomLevel
-        else:
-            log.debug(f"Attempting to take data from relevant reach via DataFrame")
-            relevant_columns = [col for col in df.columns if "Water Level" in col or "WaterLevel" in col]
-            for col in relevant_columns:
-                node_id, chainage = col.split(":")[1:]
-                node = [node for node in nodes if node.Id == f"{node_id} {round(chainage, 0)}"]
-                if node:
-                    matched_node = node[0]
-                    grid_point_index = matched_node.Reaches[0].Reach.GridPointIndexForChainage(chainage)
-                    chainage = round(chainage, 1) if "." in str(chainage) else f"{chainage}.0"
-                    invert_levels[f"{node_id} {chainage}"] = list(matched_node.Reaches[0].Reach.GridPoints)[grid_point_index].get_Z()
+        node_ids, time_series_data = get_node_time_series(data, time_steps, node_ids=geometry_rows)
+        if node_ids:
+            invert_levels = geometry["invert_level"].to_numpy()
+            rows = np.array([geometry_rows.get(node_id, -1) for node_id in node_ids], dtype=np.int64)
+            results = reduce_time_series(
+                time_series_data,
+                statistics,
+                axis=1,
+                invert_levels=np.where(rows >= 0, invert_levels[np.maximum(rows, 0)], np.nan),
+                durations=durations,
+            )
+            if "last_argmax" in results:
+                results["last_argmax"] = to_original_time_steps(results["last_argmax"], time_steps)
+            for statistic in statistics:
+                for row, value in zip(rows.tolist(), get_statistic_values(results, statistic)):
+                    if row >= 0:
+                        node_statistics[statistic][row] = value
 
     if hasattr(data, "Reaches") and include_reaches:
-        reaches = list(data.Reaches)
-        for reach in reaches:
-            try:
-                reach_id = reach.Id
-                if "-" in reach_id:
-                    reach_id = reach_id.split("-")[0]
-                grid_points = list(reach.GridPoints)
-                if grid_points:
-                    for grid_point in grid_points:
-                        log.debug(f"get_node_invert_levels - Reach: {reach_id} chainage: {grid_point.get_Chainage()} has point type: {grid_point.get_PointType()}")
-                        if grid_point.get_PointType() in [2, 1025]:  # h-point is 1025, interpolated h-point is 2
-                            chainage = grid_point.get_Chainage()
-                            chainage = round(chainage, 1) if "." in str(chainage) else f"{chainage}.0"
-                            full_grid_point_id = f"{reach_id} {chainage}"
-                            invert_levels[full_grid_point_id] = grid_point.Z
-            except:
-                log.warning(f"Bottom level data not available for reach: {reach.Id}")
+        max_water_levels, max_water_level_timings = get_aggregated_water_levels(
+            data,
+            np.max,
+            include_nodes=False,
+            include_reaches=True,
+            time_steps=time_steps,
+            reach_ids=geometry_rows,  # only reaches with an output row are read and reduced
+        )
+        for statistic, reach_values in [("max", max_water_levels), ("last_argmax", max_water_level_timings)]:
+            for reach_id, value in reach_values.items():
+                if reach_id in geometry_rows:
+                    node_statistics[statistic][geometry_rows[reach_id]] = value
+
+    return node_statistics
+
+
+def get_matched_water_level_statistics(
+    geometry: pd.DataFrame,
+    df: pd.DataFrame,
+    statistics: List[str],
+    tolerance: float = CHAINAGE_TOLERANCE,
+    time_steps: np.ndarray = None,
+    durations: np.ndarray = None,
+) -> Dict[str, List[any]]:
+    """
+    Matches reach grid points to water level columns by chainage within a tolerance and reduces the matched columns
+    :param geometry: network geometry output by get_network_geometry
+    :param df: DataFrame of time series with columns named quantity:reach:chainage
+    :param statistics: names of statistics
+    :param tolerance: maximum distance down the reach between a grid point and its matched water level point
+    :param time_steps: original index of the time steps to reduce - None for all
+    :param durations: duration in hours of each reduced time step - required for depth statistics
+    :return: {statistic: value of each geometry row} - None where not matched
+    """
+    log.debug("Calling get_matched_water_level_statistics")
+    relevant_columns = [col for col in df.columns if "Water Level" in col or "WaterLevel" in col]
+    if not relevant_columns:
+        return {statistic: [None] * len(geometry) for statistic in statistics}
+
+    is_grid_point = geometry["reach_id"].notna().to_numpy()
+    matches = np.full(len(geometry), -1, dtype=np.int64)
+    matches[is_grid_point] = match_chainages(
+        get_chainage_index(relevant_columns),
+        geometry["reach_id"].to_numpy()[is_grid_point],
+        geometry["chainage"].to_numpy()[is_grid_point],
+        tolerance=tolerance,
+    )
+    log.debug(f"Matched {np.count_nonzero(matches >= 0)} of {np.count_nonzero(is_grid_point)} grid points by chainage")
+
+    matched = matches >= 0
+    matched_columns, series = np.unique(matches[matched], return_inverse=True)
+    water_level_time_series = df[[relevant_columns[i] for i in matched_columns.tolist()]].to_numpy()  # matched only
+    if time_steps is not None:
+        water_level_time_series = water_level_time_series[time_steps]
+    results = reduce_time_series(
+        water_level_time_series[:, series],  # one series per matched grid point
+        statistics,
+        axis=0,
+        invert_levels=geometry["invert_level"].to_numpy()[matched],
+        durations=durations,
+    )
+    if "last_argmax" in results:
+        results["last_argmax"] = to_original_time_steps(results["last_argmax"], time_steps)
+    rows = np.full(len(geometry), -1, dtype=np.int64)
+    rows[matched] = np.arange(np.count_nonzero(matched))
+    return {statistic: get_statistic_values(results, statistic, rows) for statistic in statistics}
+
 
-    return invert_levels
+def get_node_time_series(
+    data: ResultData,
+    time_steps: np.ndarray = None,
+    node_ids: Optional[Container[str]] = None,
+) -> Tuple[List[str], Optional[np.ndarray]]:
+    """
+    Reads the water level time series of every node - each series is copied out of .NET as a whole array and cut to the
+    selected time steps before the series are stacked
+    :param data: result data
+    :param time_steps: original index of the time steps to keep - None for all
+    :param node_ids: ids of nodes to read - None reads every node
+    :return: node ids and array of nodes x time steps - None if no node has water levels
+    """
+    read_node_ids, node_time_series = [], []
+    for node in list(data.Nodes):
+        if node_ids is not None and node.Id not in node_ids:
+            continue
+        for node_data_set in list(node.DataItems):
+            if node_data_set.Quantity.Id in ["WaterLevel", "Water Level"]:
+                read_node_ids.append(node.Id)
+                time_series = asNumpyArray(node_data_set.CreateTimeSeriesData(0))
+                node_time_series.append(time_series if time_steps is None else time_series[time_steps])
+                break
+    return read_node_ids, np.vstack(node_time_series) if node_time_series else None
+
+
+def get_last_index_of_aggregate(
+    values: np.ndarray,
+    aggregates: np.ndarray,
+    axis: int = -1,
+) -> np.ndarray:
+    """
+    Gets index of the last occurrence of the aggregated value along an axis i.e. timestep of the last maximum
+    :param values: array of values
+    :param aggregates: aggregated values - values reduced along axis
+    :param axis: axis along which values were aggregated
+    :return: array of indices
+    """
+    matches = np.flip(values == np.expand_dims(aggregates, axis), axis=axis)
+    return values.shape[axis] - 1 - np.argmax(matches, axis=axis)
 
 
 def get_aggregated_water_levels(
@@ -219,62 +500,99 @@ def get_aggregated_water_levels(
     include_nodes: bool = True,
     include_reaches: bool = True,
     df: pd.DataFrame = None,
+    time_steps: np.ndarray = None,
+    reach_ids: Optional[Container[str]] = None,
 ) -> Tuple[Dict[str, any], Dict[str, any]]:
+    """
+    Aggregates water level time series - time series are read from .NET as whole arrays and reduced with NumPy
+    :param data: result data
+    :param aggregator: NumPy reduction accepting an axis argument i.e. np.max - None returns the time series
+    :param include_nodes: include node data items
+    :param include_reaches: include reach data items
+    :param df: DataFrame of time series - if present this is used in place of the result data
+    :param time_steps: original index of the time steps to aggregate - None for all
+    :param reach_ids: ids of reaches to aggregate - None aggregates every reach
+    :return: aggregated water levels and timestep index of the (last) aggregated value
+    """
     log.debug("Calling get_aggregated_water_levels")
     max_water_level = {}
     max_water_level_timings = {}
+    if aggregator is not None and time_steps is not None and not len(time_steps):
+        log.debug("No time steps to aggregate")
+        return max_water_level, max_water_level_timings
 
     if df is None:
         log.debug("Processing ResultData directly")
         if hasattr(data, "Nodes") and include_nodes:
-            nodes = list(data.Nodes)
-            for node in nodes:
-                node_data_sets = list(node.DataItems)
-                for node_data_set in node_data_sets:
-                    if node_data_set.Quantity.Id in ["WaterLevel", "Water Level"]:
-                        data = list(node_data_set.TimeData)
-                        max_water_level[node.Id] = aggregator(data) if aggregator is not None else data
-                        max_water_level_timings[node.Id] = None
-                        if aggregator is not None:
-                            max_water_level_timings[node.Id] = len(data) - 1 - data[::-1].index(max_water_level[node.Id])
-                        break
+            node_ids, time_series_data = get_node_time_series(data, time_steps)  # nodes x time steps
+            if node_ids:
+                if aggregator is not None:
+                    aggregated = aggregator(time_series_data, axis=1)
+                    timings = to_original_time_steps(
+                        get_last_index_of_aggregate(time_series_data, aggregated, axis=1),
+                        time_steps,
+                    )
+                    max_water_level.update(zip(node_ids, aggregated.tolist()))
+                    max_water_level_timings.update(zip(node_ids, timings.tolist()))
+                else:
+                    max_water_level.update(zip(node_ids, time_series_data.tolist()))
+                    max_water_level_timings.update((node_id, None) for node_id in node_ids)
 
         if hasattr(data, "Reaches") and include_reaches:
             reaches = list(data.Reaches)
             for reach in reaches:
+                if reach_ids is not None and reach.Id not in reach_ids:
+                    continue
                 reach_data_sets = list(reach.DataItems)
                 for reach_data_set in reach_data_sets:
                     if reach_data_set.Quantity.Id in ["WaterLevel", "Water Level"]:
-                        element_data = []
-                        for element_index in range(reach_data_set.NumberOfElements):
-                            time_series_data = []
-                            for x in range(reach_data_set.TimeData.NumberOfTimeSteps):
-                                time_series_data.append(reach_data_set.TimeData.GetValue(x, element_index))
-                            aggregated_time_series_data = aggregator(time_series_data) if aggregator is not None else time_series_data
-                            element_data.append(aggregated_time_series_data)
-                        max_water_level[reach.Id] = aggregator(element_data) if aggregator is not None else element_data
+                        time_series_data = np.vstack(
+                            [
+                                asNumpyArray(reach_data_set.CreateTimeSeriesData(element_index))
+                                for element_index in range(reach_data_set.NumberOfElements)
+                            ]
+                        )  # elements x time steps
+                        if time_steps is not None:
+                            time_series_data = time_series_data[:, time_steps]
                         max_water_level_timings[reach.Id] = None
                         if aggregator is not None:
-                            max_water_level_timings[reach.Id] = len(element_data) - 1 - element_data[::-1].index(max_water_level[reach.Id])
+                            element_data = aggregator(time_series_data, axis=1)
+                            max_water_level[reach.Id] = aggregator(element_data).item()
+                            max_water_level_timings[reach.Id] = get_last_index_of_aggregate(
+                                element_data,
+                                max_water_level[reach.Id],
+                            ).item()
+                        else:
+                            max_water_level[reach.Id] = time_series_data.tolist()
                         break
 
     else:
         log.debug("Processing DataFrame")
         relevant_columns = [col for col in df.columns if "Water Level" in col or "WaterLevel" in col]
-        relevant_df = df[relevant_columns]
-        for col in relevant_df.columns:
-            node_id, chainage = col.split(":")[1:]
-            water_level_time_series = df[col].to_list()
-            if "." in str(chainage):
-                if chainage[-1] == "5":  # addresses python incorrect rounding cases
-                    chainage = round(float(chainage) + 0.01, 1)
+        if relevant_columns:
+            water_level_time_series = df[relevant_columns].to_numpy()  # time steps x columns
+            if time_steps is not None:
+                water_level_time_series = water_level_time_series[time_steps]
+            max_water_level_time_series = water_level_time_series.max(axis=0)
+            max_water_level_time_series_timings = to_original_time_steps(
+                get_last_index_of_aggregate(water_level_time_series, max_water_level_time_series, axis=0),
+                time_steps,
+            )
+            for col, column_max, column_max_timing in zip(
+                relevant_columns,
+                max_water_level_time_series.tolist(),
+                max_water_level_time_series_timings.tolist(),
+            ):
+                node_id, chainage = col.split(":")[1:]
+                if "." in str(chainage):
+                    if chainage[-1] == "5":  # addresses python incorrect rounding cases
+                        chainage = round(float(chainage) + 0.01, 1)
+                    else:
+                        chainage = round(float(chainage), 1)
                 else:
-                    chainage = round(float(chainage), 1)
-            else:
-                chainage = f"{chainage}.0"
-            max_water_level_time_series = max(water_level_time_series)
-            max_water_level[f"{node_id} {chainage}"] = max_water_level_time_series
-            max_water_level_timings[f"{node_id} {chainage}"] = len(water_level_time_series) - 1 - water_level_time_series[::-1].index(max_water_level_time_series)
+                    chainage = f"{chainage}.0"
+                max_water_level[f"{node_id} {chainage}"] = column_max
+                max_water_level_timings[f"{node_id} {chainage}"] = column_max_timing
 
     return max_water_level, max_water_level_timings
 
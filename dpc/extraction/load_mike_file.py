@@ -10,25 +10,268 @@ Created on 2021-10-27
 @email: edmund.bennett@ghd.com
 """
 
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional, Iterable, Deque, Callable, Union
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, Future
+from os import makedirs, remove, rmdir, stat
+from os.path import join, split, abspath
+from shutil import copyfile, rmtree
+from threading import Lock
+from time import perf_counter
+import gc
+import tempfile
 import pandas as pd
-from mikeio1d.res1d import ResultData, Diagnostics, Connection, Res1D
+from mikeio1d.res1d import ResultData, Diagnostics
+from dpc.extraction.res1d_reader import Res1DReader, load_result_data
 from dpc.utils.logger import logger as log
 
+WATER_LEVEL_QUANTITIES = ["WaterLevel", "Water Level"]  # res1d/prf and res11 quantity ids respectively
 
-def load_prf_file(file_path: str) -> Tuple[ResultData, None]:
+
+def load_prf_file(
+    file_path: str,
+    quantities: Optional[List[str]] = WATER_LEVEL_QUANTITIES,
+    node_ids: Optional[List[str]] = None,
+    reach_ids: Optional[List[str]] = None,
+) -> Tuple[ResultData, None]:
+    """
+    Loads prf file - the header is loaded first so that only the data items of the requested quantities and locations
+    are read
+    :param file_path: path to prf file
+    :param quantities: quantity ids to load - None loads every quantity
+    :param node_ids: ids of nodes of which to load data items - None loads every node
+    :param reach_ids: ids of reaches of which to load data items - None loads every reach
+    :return: result data
+    """
     log_entry = f"Loading file: {file_path}"
     log.info(log_entry)
-    resultData = ResultData()
-    resultData.Connection = Connection.Create(file_path)
-    resultData.Load(Diagnostics(log_entry))
+    resultData = load_result_data(file_path, quantities, node_ids, reach_ids, Diagnostics(log_entry))
     return resultData, None
 
 
-def load_res_file(file_path: str) -> Tuple[ResultData, Optional[pd.DataFrame]]:
+def load_res_file(
+    file_path: str,
+    quantities: Optional[List[str]] = WATER_LEVEL_QUANTITIES,
+    node_ids: Optional[List[str]] = None,
+    reach_ids: Optional[List[str]] = None,
+    read_lazily: bool = False,
+) -> Tuple[ResultData, Union[pd.DataFrame, Callable[[Optional[List[str]]], pd.DataFrame], None]]:
+    """
+    Loads res11 file and reads time series of the requested quantities to a DataFrame - only the data items of the
+    requested quantities and locations are loaded
+    :param file_path: path to res11 file
+    :param quantities: quantity ids to load and read - None loads and reads every quantity
+    :param node_ids: ids of nodes of which to load data items - None loads every node
+    :param reach_ids: ids of reaches of which to load data items - None loads every reach
+    :param read_lazily: return a function reading the time series of given reach ids in place of the DataFrame, so
+        that only the reaches of a subset found from the network geometry are read
+    :return: result data and DataFrame of time series, or the function reading it
+    """
     log.info(f"Loading file: {file_path}")
-    resultData = Res1D(file_path)
-    return resultData.data, resultData.read()
+    resultData = Res1DReader(file_path, quantities=quantities, node_ids=node_ids, reach_ids=reach_ids)
+    if read_lazily:
+        return resultData.data, partial(resultData.read_quantities, quantities)
+    if quantities is None:
+        return resultData.data, resultData.read()
+    return resultData.data, resultData.read_quantities(quantities)
+
+
+def dispose_result_data(data: Optional[ResultData]) -> None:
+    """Disposes result data where the .NET object supports it"""
+    dispose = getattr(data, "Dispose", None)
+    if callable(dispose):
+        try:
+            dispose()
+        except Exception as e:
+            log.debug(f"Unable to dispose result data. Error: {e}")
+
+
+def collect_garbage() -> None:
+    """
+    Collects Python then .NET garbage so that the managed memory of released result data is returned before the next
+    file is loaded - pythonnet otherwise holds .NET objects until the Python wrapper happens to be collected
+    """
+    gc.collect()
+    try:
+        from System import GC
+
+        GC.Collect()
+        GC.WaitForPendingFinalizers()
+        GC.Collect()
+    except ImportError:  # no .NET runtime loaded
+        pass
+
+
+class ResultFile:
+    """
+    Holds a loaded result file for the duration of a with block - the result data is released on exit. Use the data
+    through the data and df attributes rather than holding references to them so that the memory is returned.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        load_file: Callable[[str], Tuple[ResultData, Optional[pd.DataFrame]]] = load_prf_file,
+    ):
+        """
+        :param file_path: path to result file
+        :param load_file: function loading the file i.e. load_prf_file or load_res_file
+        """
+        self.file_path = file_path
+        self.load_file = load_file
+        self.data: Optional[ResultData] = None
+        self.df: Union[pd.DataFrame, Callable[[Optional[List[str]]], pd.DataFrame], None] = None
+
+    def __enter__(self) -> "ResultFile":
+        return self.open()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def open(self) -> "ResultFile":
+        self.data, self.df = self.load_file(self.file_path)
+        return self
+
+    def close(self) -> None:
+        if self.data is None:
+            return
+        log.debug(f"Releasing file: {self.file_path}")
+        dispose_result_data(self.data)
+        self.data, self.df = None, None
+        collect_garbage()
+
+
+class FileStager:
+    """
+    Copies result files to local scratch ahead of their loading so that network I/O of the next files overlaps
+    processing of the current file. Files must be requested with get in the order they were scheduled. Copies are
+    removed on release and the scratch directory is removed on close.
+    """
+
+    def __init__(
+        self,
+        scratch_directory: str,
+        prefetch_count: int = 2,
+        max_bytes: int = 4 * 1024 * 1024 * 1024,
+    ):
+        """
+        :param scratch_directory: local directory in which to stage files - a temporary subdirectory is used
+        :param prefetch_count: number of files to copy ahead of the file being processed
+        :param max_bytes: size limit of staged files - files larger than this are loaded in place
+        """
+        makedirs(scratch_directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="dpc_stage_", dir=scratch_directory)
+        self.prefetch_count = max(1, prefetch_count)
+        self.max_bytes = max_bytes
+        self.io_wait_s = 0.0
+        self.copy_s = 0.0
+        self.compute_s = 0.0
+        self.staged_bytes = 0
+        self.staged_files = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.prefetch_count, thread_name_prefix="dpc_stage")
+        self._lock = Lock()
+        self._pending: Deque[str] = deque()
+        self._staging: Deque[Tuple[str, int, Future]] = deque()
+        self._in_use = {}
+        self._reserved_bytes = 0
+        self._count = 0
+        log.info(f"Staging up to {self.prefetch_count} files ahead in: {self.directory}")
+
+    def __enter__(self) -> "FileStager":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def schedule(self, file_paths: Iterable[str]) -> None:
+        """
+        Queues files for staging in the order they will be requested
+        :param file_paths: paths of result files
+        """
+        self._pending.extend(file_paths)
+        self._fill()
+
+    def _fill(self) -> None:
+        while self._pending and len(self._staging) < self.prefetch_count:
+            file_path = self._pending[0]
+            try:
+                size = stat(file_path).st_size
+            except OSError:
+                size = 0
+            if size > self.max_bytes:
+                log.debug(f"File exceeds staging budget - loading in place: {file_path}")
+                future = Future()
+                future.set_result(file_path)
+                self._staging.append((self._pending.popleft(), 0, future))
+                continue
+            if self._reserved_bytes + size > self.max_bytes and (self._staging or self._in_use):
+                break  # wait for staged files to be released
+            self._pending.popleft()
+            self._reserved_bytes += size
+            self._count += 1
+            local_file_path = join(self.directory, str(self._count), split(file_path)[-1])
+            self._staging.append((file_path, size, self._executor.submit(self._copy, file_path, local_file_path)))
+
+    def _copy(self, file_path: str, local_file_path: str) -> str:
+        start = perf_counter()
+        try:
+            makedirs(split(local_file_path)[0], exist_ok=True)
+            copyfile(file_path, local_file_path)
+        except OSError as e:
+            log.warning(f"Unable to stage file - loading in place: {file_path}. Error: {e}")
+            return file_path
+        with self._lock:
+            self.copy_s += perf_counter() - start
+        return local_file_path
+
+    def get(self, file_path: str) -> str:
+        """
+        Waits for the next scheduled file to be staged
+        :param file_path: path of result file - must be the next scheduled file
+        :return: path of local copy - the original path if the file could not be staged
+        """
+        if not self._staging or self._staging[0][0] != file_path:
+            log.warning(f"File not scheduled for staging - loading in place: {file_path}")
+            return file_path
+        _, size, future = self._staging.popleft()
+        start = perf_counter()
+        local_file_path = future.result()
+        self.io_wait_s += perf_counter() - start
+        if local_file_path != file_path:
+            self.staged_files += 1
+            self.staged_bytes += size
+        self._in_use[local_file_path] = (size, perf_counter())
+        self._fill()
+        return local_file_path
+
+    def release(self, local_file_path: str) -> None:
+        """
+        Removes the local copy of a file once it has been processed
+        :param local_file_path: path returned by get
+        """
+        size, start = self._in_use.pop(local_file_path, (0, None))
+        if start is not None:
+            self.compute_s += perf_counter() - start
+        if abspath(local_file_path).startswith(abspath(self.directory)):
+            try:
+                remove(local_file_path)
+                rmdir(split(local_file_path)[0])
+            except OSError as e:
+                log.warning(f"Unable to remove staged file: {local_file_path}. Error: {e}")
+        self._reserved_bytes -= size
+        self._fill()
+
+    def close(self) -> None:
+        self._pending.clear()
+        for _, _, future in self._staging:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        rmtree(self.directory, ignore_errors=True)
+        log.info(
+            f"Staged {self.staged_files} files ({self.staged_bytes / 1024 / 1024:.1f} MB) - "
+            f"I/O wait: {self.io_wait_s:.2f} s, compute: {self.compute_s:.2f} s, background copy: {self.copy_s:.2f} s"
+        )
 
 
 if __name__ == "__main__":
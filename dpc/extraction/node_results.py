@@ -0,0 +1,189 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Dict, Optional
+import numpy as np
+
+from dpc.utils.logger import logger as log
+
+
+class NodeResults:
+    """
+    Columnar container of data extracted from result files - one row per node per file.
+    Node ids and files are held once and referenced by integer codes, values are held in float arrays with NaN where a
+    value is not available.
+    """
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.files: List[str] = []
+        self.file_types: List[str] = []
+        self.projections: List[str] = []
+        self._node_id_codes: Dict[str, int] = {}
+        self._file_codes: Dict[str, int] = {}
+        self._row_count = 0
+        self._node_code_chunks: List[np.ndarray] = []
+        self._file_code_chunks: List[np.ndarray] = []
+        self._value_chunks: Dict[str, List[np.ndarray]] = {}
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+        self._row_index: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def append_file(
+        self,
+        file_name: str,
+        file_type: str,
+        projection: str,
+        nodes: Dict[str, Dict[str, any]],
+    ) -> None:
+        """
+        Appends the data extracted from a single file
+        :param file_name: name of file
+        :param file_type: file extension i.e. prf
+        :param projection: projection string of file
+        :param nodes: values of each node i.e. {node_id: {"x": 1.0, "max_water_level": None, ...}} as output by get_data
+        """
+        log.debug(f"Appending {len(nodes)} nodes of file: {file_name}")
+        if file_name not in self._file_codes:
+            self._file_codes[file_name] = len(self.files)
+            self.files.append(file_name)
+            self.file_types.append(file_type)
+            self.projections.append(projection)
+        file_code = self._file_codes[file_name]
+
+        row_count = len(nodes)
+        self._node_code_chunks.append(
+            np.fromiter((self._get_node_code(node_id) for node_id in nodes), dtype=np.int32, count=row_count)
+        )
+        self._file_code_chunks.append(np.full(row_count, file_code, dtype=np.int32))
+
+        column_names = list(dict.fromkeys(column for values in nodes.values() for column in values))
+        for column in column_names:
+            if column not in self._value_chunks:  # values of previous rows are not available
+                self._value_chunks[column] = [np.full(self._row_count, np.nan)]
+            self._value_chunks[column].append(
+                np.array(
+                    [np.nan if value is None else value for value in (values.get(column) for values in nodes.values())],
+                    dtype=np.float64,
+                )
+            )
+        for column, chunks in self._value_chunks.items():
+            if column not in column_names:
+                chunks.append(np.full(row_count, np.nan))
+
+        self._row_count += row_count
+        self._arrays = None
+        self._row_index = None
+
+    def _get_node_code(self, node_id: str) -> int:
+        node_code = self._node_id_codes.get(node_id)
+        if node_code is None:
+            node_code = self._node_id_codes[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+        return node_code
+
+    def _get_arrays(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:  # consolidate chunks so that later access is contiguous
+            self._arrays = {
+                "node_codes": np.concatenate(self._node_code_chunks or [np.empty(0, dtype=np.int32)]),
+                "file_codes": np.concatenate(self._file_code_chunks or [np.empty(0, dtype=np.int32)]),
+            }
+            for column, chunks in self._value_chunks.items():
+                self._arrays[column] = np.concatenate(chunks)
+            self._node_code_chunks = [self._arrays["node_codes"]]
+            self._file_code_chunks = [self._arrays["file_codes"]]
+            self._value_chunks = {column: [self._arrays[column]] for column in self._value_chunks}
+        return self._arrays
+
+    @property
+    def node_codes(self) -> np.ndarray:
+        """Index into node_ids of each row"""
+        return self._get_arrays()["node_codes"]
+
+    @property
+    def file_codes(self) -> np.ndarray:
+        """Index into files of each row"""
+        return self._get_arrays()["file_codes"]
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._value_chunks.keys())
+
+    def column(self, column_name: str) -> np.ndarray:
+        """
+        Gets values of a column - NaN where not available
+        :param column_name: i.e. max_water_level
+        :return: array with one value per row
+        """
+        if column_name not in self._value_chunks:
+            return np.full(self._row_count, np.nan)
+        return self._get_arrays()[column_name]
+
+    def get_file_code(self, file_name: str) -> int:
+        """Gets code of file - -1 if there is no data for the file"""
+        return self._file_codes.get(file_name, -1)
+
+    def merge_nodes(self, merged_codes: np.ndarray) -> None:
+        """
+        Relabels nodes with the node they are merged into - ids of merged nodes continue to refer to the merged node so
+        that data of files appended later are merged too
+        :param merged_codes: code of the node each node is merged into - its own code where it is not merged
+        """
+        kept_codes = np.flatnonzero(merged_codes == np.arange(len(merged_codes)))
+        new_codes = np.full(len(merged_codes), -1, dtype=np.int64)
+        new_codes[kept_codes] = np.arange(len(kept_codes))
+        new_codes = new_codes[merged_codes]
+
+        arrays = self._get_arrays()
+        arrays["node_codes"] = new_codes[arrays["node_codes"]].astype(np.int32)
+        self._node_code_chunks = [arrays["node_codes"]]
+        self.node_ids = [self.node_ids[node_code] for node_code in kept_codes.tolist()]
+        self._node_id_codes = {node_id: int(new_codes[node_code]) for node_id, node_code in self._node_id_codes.items()}
+        self._row_index = None
+
+    def get_merged_node_ids(self) -> Dict[str, str]:
+        """Gets ids of merged nodes and the id of the node each is merged into"""
+        return {
+            node_id: self.node_ids[node_code]
+            for node_id, node_code in self._node_id_codes.items()
+            if self.node_ids[node_code] != node_id
+        }
+
+    def get_row_index(self) -> np.ndarray:
+        """
+        Gets row of each node and file - where a node appears more than once in a file the first row is used
+        :return: array of shape (nodes, files) with -1 where a node is not present in a file - held until a file is appended
+        """
+        if self._row_index is None:
+            row_index = np.full((len(self.node_ids), len(self.files)), -1, dtype=np.int64)
+            keys = self.node_codes.astype(np.int64) * len(self.files) + self.file_codes
+            unique_keys, first_rows = np.unique(keys, return_index=True)
+            row_index.flat[unique_keys] = first_rows
+            self._row_index = row_index
+        return self._row_index
+
+    def get_ordered_row_index(self, ordered_files: List[str]) -> np.ndarray:
+        """
+        Gets row of each node and listed file
+        :param ordered_files: names of files in column order
+        :return: array of shape (nodes, listed files) with -1 where a node is not present in a file or a file has no data
+        """
+        file_codes = np.array([self.get_file_code(file_name) for file_name in ordered_files], dtype=np.int64)
+        if not len(self.files):
+            return np.full((len(self.node_ids), len(file_codes)), -1, dtype=np.int64)
+        return np.where(file_codes >= 0, self.get_row_index()[:, np.maximum(file_codes, 0)], -1)
+
+
+if __name__ == "__main__":
+    pass
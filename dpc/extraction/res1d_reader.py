@@ -0,0 +1,292 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Tuple, Optional, Union
+import ctypes
+import os.path
+import numpy as np
+import pandas as pd
+from mikeio1d.res1d import (
+    Res1D,
+    ResultData,
+    Connection,
+    Diagnostics,
+    NAME_DELIMITER,
+    QueryData,
+    QueryDataReach,
+    QueryDataNode,
+)
+from mikeio1d.custom_exceptions import NoDataForQuery, InvalidQuantity
+from mikeio1d.dotnet import asNumpyArray
+from DHI.Mike1D.ResultDataAccess import ResultDataQuery, Filter, DataItemFilterName
+from System.Runtime.InteropServices import GCHandle, GCHandleType
+
+from dpc.extraction.time_window import get_result_times
+from dpc.utils.logger import logger as log
+
+
+def get_quantity_filter(
+    data: ResultData,
+    quantities: List[str],
+) -> Optional[any]:
+    """
+    Gets a data item filter including the given quantities only
+    :param data: result data with header loaded
+    :param quantities: quantity ids to include
+    :return: filter - None where the installed MIKE 1D does not provide a quantity filter
+    """
+    try:
+        from DHI.Mike1D.ResultDataAccess import DataItemFilterQuantity
+
+        quantity_filter = DataItemFilterQuantity()
+        for quantity in list(data.Quantities):
+            if quantity.Id in quantities:
+                quantity_filter.Quantities.Add(quantity)
+        return quantity_filter
+    except Exception as e:  # ImportError, or a different API in this version of MIKE 1D
+        log.debug(f"Quantity filter not available - all quantities of included locations are loaded. Error: {e}")
+        return None
+
+
+def get_header_reach_ids(
+    data: ResultData,
+    reach_ids: List[str],
+) -> List[str]:
+    """
+    Gets ids of the reaches of the loaded header matching the given ids - reaches are matched by id and by id without
+    anything after a "-" as in get_network_geometry, so that every part of a split reach is included
+    :param data: result data with header loaded
+    :param reach_ids: ids of reaches
+    :return: reach ids of the result data
+    """
+    requested = set(reach_ids)
+    return [reach.Id for reach in list(data.Reaches) if reach.Id in requested or reach.Id.split("-")[0] in requested]
+
+
+def load_result_data(
+    file_path: str,
+    quantities: Optional[List[str]] = None,
+    node_ids: Optional[List[str]] = None,
+    reach_ids: Optional[List[str]] = None,
+    diagnostics: Optional[Diagnostics] = None,
+) -> ResultData:
+    """
+    Loads result data - where data items are filtered the header is loaded first and only included data items are read
+    :param file_path: path to result file
+    :param quantities: quantity ids to load i.e. ["WaterLevel"] - None loads every quantity
+    :param node_ids: ids of nodes of which to load data items - None loads every node, unless only reach_ids are given
+    :param reach_ids: ids of reaches of which to load data items, with or without the "-N" suffix of split reaches - None
+        loads every reach, unless only node_ids are given
+    :param diagnostics: diagnostics of loading
+    :return: result data
+    """
+    if diagnostics is None:
+        diagnostics = Diagnostics(f"Loading file: {file_path}")
+    data = ResultData()
+    data.Connection = Connection.Create(file_path)
+
+    data_item_filters = []
+    if quantities is not None or node_ids is not None or reach_ids is not None:
+        data.LoadHeader(True, diagnostics)
+        if node_ids is not None or reach_ids is not None:
+            name_filter = DataItemFilterName(data)
+            for node_id in node_ids or []:
+                name_filter.Nodes.Add(node_id)
+            for reach_id in get_header_reach_ids(data, reach_ids or []):
+                name_filter.Reaches.Add(reach_id)
+            data_item_filters.append(name_filter)
+        if quantities is not None:
+            quantity_filter = get_quantity_filter(data, quantities)
+            if quantity_filter is not None:
+                data_item_filters.append(quantity_filter)
+
+    if not data_item_filters:
+        if quantities is not None or node_ids is not None or reach_ids is not None:
+            data.LoadData(diagnostics)  # header already loaded
+        else:
+            data.Load(diagnostics)
+        return data
+
+    data_filter = Filter()
+    for data_item_filter in data_item_filters:
+        data_filter.AddDataItemFilter(data_item_filter)
+    data.Parameters.Filter = data_filter
+    log.debug(f"Loading filtered data items of file: {file_path}")
+    data.LoadData(diagnostics)
+    return data
+
+
+def get_column_names(
+    data_set: any,
+    data_item: any,
+    col_name_delimiter: str = NAME_DELIMITER,
+    put_chainage_in_col_name: bool = True,
+) -> List[Tuple[str, Tuple[any, int]]]:
+    """
+    Names the time series of a data item without reading them - names are as per Res1D.get_values
+    :param data_set: node, reach or catchment of the data item
+    :param data_item: data item
+    :param col_name_delimiter: delimiter of quantity, name and chainage
+    :param put_chainage_in_col_name: name reach time series by chainage rather than element index
+    :return: column name and (data item, element index) of each time series
+    """
+    name = data_set.Name if hasattr(data_set, "Name") else data_set.Id
+    if data_item.IndexList is None:
+        return [(col_name_delimiter.join([data_item.Quantity.Id, name]), (data_item, 0))]
+    chainages = data_set.GetChainages(data_item) if put_chainage_in_col_name else None
+    return [
+        (
+            col_name_delimiter.join([data_item.Quantity.Id, name, f"{chainages[i]:g}" if put_chainage_in_col_name else str(i)]),
+            (data_item, i),
+        )
+        for i in range(data_item.NumberOfElements)
+    ]
+
+
+def copy_time_series(values: any, destination: np.ndarray) -> None:
+    """
+    Copies a .NET float array into a contiguous float32 NumPy array with a single memmove - other arrays are converted
+    :param values: .NET array of values i.e. as returned by CreateTimeSeriesData
+    :param destination: contiguous array of the same length
+    """
+    if values.GetType().GetElementType().Name != "Single" or values.Length != destination.size:
+        destination[:] = asNumpyArray(values)
+        return
+    handle = GCHandle.Alloc(values, GCHandleType.Pinned)
+    try:
+        ctypes.memmove(destination.ctypes.data, handle.AddrOfPinnedObject().ToInt64(), destination.nbytes)
+    finally:
+        handle.Free()
+
+
+class Res1DReader(Res1D):
+    """
+    Extends mikeio1d Res1D with filtered loading, reading of selected quantities only and reading to a DataFrame built
+    once from a float32 array rather than column by column
+    """
+
+    def __init__(
+        self,
+        file_path: str = None,
+        put_chainage_in_col_name: bool = True,
+        quantities: Optional[List[str]] = None,
+        node_ids: Optional[List[str]] = None,
+        reach_ids: Optional[List[str]] = None,
+    ):
+        """
+        :param file_path: path to result file
+        :param put_chainage_in_col_name: include chainage in column names of reach data
+        :param quantities: quantity ids to load - None loads every quantity
+        :param node_ids: ids of nodes of which to load data items - None loads every node, unless only reach_ids are given
+        :param reach_ids: ids of reaches of which to load data items - None loads every reach, unless only node_ids are given
+        """
+        self._quantities = quantities
+        self._node_ids = node_ids
+        self._reach_ids = reach_ids
+        super().__init__(file_path, put_chainage_in_col_name)
+
+    def _load_file(self):
+        if not os.path.exists(self.file_path):
+            raise FileExistsError(f"File {self.file_path} does not exist.")
+
+        self._data = load_result_data(self.file_path, self._quantities, self._node_ids, self._reach_ids, Diagnostics())
+        self._query = ResultDataQuery(self._data)
+
+    @property
+    def time_index(self) -> pd.DatetimeIndex:
+        """
+        pandas.DatetimeIndex of the time steps - converted in bulk by get_result_times, to full tick precision
+        """
+        if self._time_index is None:
+            self._time_index = pd.DatetimeIndex(get_result_times(self.data, self.query))
+        return self._time_index
+
+    def read(self, queries: Optional[Union[QueryData, List[QueryData]]] = None) -> pd.DataFrame:
+        """
+        Read loaded result data to a DataFrame - each query result is copied into a single float32 array from which the
+        DataFrame is built once
+        :param queries: a single query or a list of queries - None reads all data
+        :return: DataFrame of time series indexed by time with a column per query
+        """
+        if queries is None:
+            return self.read_all()
+        queries = queries if isinstance(queries, list) else [queries]
+
+        block = np.empty((len(queries), self.data.NumberOfTimeSteps), dtype=np.float32)  # columns x time steps
+        for row, query in enumerate(queries):
+            copy_time_series(self.get_query_values(query), block[row])
+        return pd.DataFrame(block.T, index=self.time_index, columns=[str(query) for query in queries], copy=False)
+
+    def read_all(self) -> pd.DataFrame:
+        """
+        Read all data to a DataFrame - as Res1D.read_all but built once from a single float32 array
+        :return: DataFrame of time series indexed by time with columns sorted by name
+        """
+        return self.read_quantities(None)
+
+    def read_quantities(
+        self,
+        quantities: Optional[List[str]],
+        reach_ids: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read the data items of the given quantities to a DataFrame - columns are named as per Res1D.read_all. Every time
+        series is copied from .NET directly into a row of a preallocated float32 array, in column order, and the
+        DataFrame is built once on the transpose of that array without further copies
+        :param quantities: quantity ids to read i.e. ["WaterLevel", "Water Level"] - None reads every quantity
+        :param reach_ids: ids of reaches to read, with or without the "-N" suffix of split reaches - other data sets are
+            not read. None reads every data set
+        :return: DataFrame of time series indexed by time with columns sorted by name
+        """
+        log.debug(f"Reading quantities: {quantities}")
+        requested = None if reach_ids is None else set(reach_ids)
+        columns = {}  # {column name: (data item, element index)} - a later data item of the same name replaces the earlier
+        for data_set in self.data.DataSets:
+            name = data_set.Name if hasattr(data_set, "Name") else data_set.Id
+            if requested is not None and name not in requested and name.split("-")[0] not in requested:
+                continue
+            for data_item in data_set.DataItems:
+                if quantities is None or data_item.Quantity.Id in quantities:
+                    columns.update(
+                        get_column_names(data_set, data_item, NAME_DELIMITER, self._put_chainage_in_col_name)
+                    )
+
+        column_names = sorted(columns)
+        block = np.empty((len(column_names), self.data.NumberOfTimeSteps), dtype=np.float32)  # columns x time steps
+        for row, column_name in enumerate(column_names):
+            data_item, element_index = columns[column_name]
+            copy_time_series(data_item.CreateTimeSeriesData(element_index), block[row])
+        log.debug(f"Read {len(column_names)} time series to a {block.nbytes / 1024 / 1024:.1f} MB array")
+        return pd.DataFrame(block.T, index=self.time_index, columns=column_names, copy=False)
+
+    def get_query_values(self, query: QueryData) -> any:
+        """
+        Gets the .NET array of values of a query - as QueryData.get_values without conversion element by element
+        :param query: reach or node query
+        :return: .NET array of values
+        """
+        if isinstance(query, QueryDataReach):
+            if query.quantity not in self.quantities:
+                raise InvalidQuantity(
+                    f"Undefined quantity {query.quantity}. Allowed quantities are: {', '.join(self.quantities)}."
+                )
+            values = self.query.GetReachValues(query.name, query.chainage, query.quantity)
+        elif isinstance(query, QueryDataNode):
+            values = self.query.GetNodeValues(query.name, query.quantity)
+        else:
+            return query.get_values(self)
+        if values is None:
+            raise NoDataForQuery(str(query))
+        return values
+
+if __name__ == "__main__":
+    pass
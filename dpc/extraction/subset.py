@@ -0,0 +1,96 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+
+Subsets of nodes and reach grid points by id list, id regular expression and bounding box. Id lists may hold node ids
+i.e. SUMN.Junction.CCCGIS.1, grid point ids i.e. "SUMN.SUMNSTM 281.5" or reach ids i.e. SUMN.SUMNSTM (every grid point
+of the reach). Where more than one criterion is given a node must meet all of them.
+"""
+
+from typing import List, Tuple, Optional
+import pandas as pd
+
+from dpc.utils.logger import logger as log
+
+
+def read_id_list(file_path: str) -> List[str]:
+    """
+    Reads ids from a text file - one id per line, blank lines and lines starting with # are ignored
+    :param file_path: path of id list file
+    :return: ids in file order without duplicates
+    """
+    with open(file_path, "r") as id_file:
+        ids = [line.strip() for line in id_file]
+    return list(dict.fromkeys(e for e in ids if e and not e.startswith("#")))
+
+
+def get_reach_id(item_id: str) -> str:
+    """
+    Gets reach id of a grid point id i.e. SUMN.SUMNSTM of "SUMN.SUMNSTM 281.5" - ids without a chainage are returned as is
+    :param item_id: grid point, reach or node id
+    :return: reach id
+    """
+    reach_id, _, chainage = item_id.rpartition(" ")
+    try:
+        float(chainage)
+    except ValueError:
+        return item_id
+    return reach_id or item_id
+
+
+def get_loader_ids(ids: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Gets the node and reach ids with which to filter the data items loaded from a result file
+    :param ids: ids of an id list
+    :return: node ids and reach ids - every id may be a node id, reach ids are those of grid point and reach ids
+    """
+    return list(ids), list(dict.fromkeys(get_reach_id(e) for e in ids))
+
+
+def filter_geometry(
+    geometry: pd.DataFrame,
+    ids: Optional[List[str]] = None,
+    id_regex: Optional[str] = None,
+    bbox: Optional[List[float]] = None,
+) -> pd.DataFrame:
+    """
+    Keeps the nodes and grid points of the subset
+    :param geometry: network geometry output by get_network_geometry
+    :param ids: node, grid point or reach ids to keep - None keeps every id
+    :param id_regex: regular expression searched for in node ids - None keeps every id
+    :param bbox: xmin, ymin, xmax, ymax of points to keep, in the units of the input projection - None keeps every point
+    :return: rows of geometry in the subset
+    """
+    if ids is None and id_regex is None and bbox is None:
+        return geometry
+    included = pd.Series(True, index=geometry.index)
+    if ids is not None:
+        id_set = set(ids)
+        included &= geometry["node_id"].isin(id_set) | geometry["reach_id"].isin(id_set)
+    if id_regex is not None:
+        included &= geometry["node_id"].str.contains(id_regex, regex=True)
+    if bbox is not None:
+        xmin, ymin, xmax, ymax = bbox
+        included &= geometry["x"].between(xmin, xmax) & geometry["y"].between(ymin, ymax)
+    log.info(f"Subset of {int(included.sum())} of {len(geometry)} nodes and grid points")
+    return geometry[included.to_numpy()]
+
+
+def get_subset_reach_ids(geometry: pd.DataFrame) -> List[str]:
+    """
+    Gets ids of the reaches of the grid points of a subset - the reaches of which time series are read
+    :param geometry: network geometry output by filter_geometry
+    :return: reach ids in geometry order
+    """
+    return geometry["reach_id"].dropna().unique().tolist()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,115 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from System import String
+    from DHI.Mike1D.ResultDataAccess import ResultDataQuery
+except ImportError:  # MIKE .NET libraries unavailable i.e. synthetic result data
+    String, ResultDataQuery = None, None
+
+from dpc.utils.logger import logger as log
+
+DOTNET_TIME_FORMAT = "yyyy-MM-dd'T'HH:mm:ss.fffffff"  # every digit of the 100 ns ticks - parsed by NumPy
+TIME_DELIMITER = "|"
+DOTNET_EPOCH_TICKS = 621355968000000000  # ticks from 0001-01-01 to 1970-01-01
+
+
+def ticks_to_datetime64(ticks: np.ndarray) -> np.ndarray:
+    """
+    Converts .NET DateTime ticks (100 ns intervals from 0001-01-01) to datetime64
+    :param ticks: array of ticks
+    :return: array of datetime64[ns]
+    """
+    return ((np.asarray(ticks, dtype=np.int64) - DOTNET_EPOCH_TICKS) * 100).astype("datetime64[ns]")
+
+
+def get_result_times(
+    data: any,
+    query: any = None,
+) -> np.ndarray:
+    """
+    Gets time of each time step of result data to full tick precision. The times are formatted and joined to a single
+    string in .NET - two interop calls in all - and parsed by NumPy, rather than each DateTime being read field by field.
+    Where the .NET libraries are unavailable the ticks of each time are read
+    :param data: result data
+    :param query: ResultDataQuery of the result data - created if not given
+    :return: array of datetime64[ns]
+    """
+    if String is not None and ResultDataQuery is not None:
+        if query is None:
+            query = ResultDataQuery(data)
+        joined_times = String.Join(TIME_DELIMITER, query.GetDateTimesAsStrings(DOTNET_TIME_FORMAT))
+        if not joined_times:
+            return np.array([], dtype="datetime64[ns]")
+        return np.array(joined_times.split(TIME_DELIMITER), dtype="datetime64[ns]")
+    return ticks_to_datetime64(np.fromiter((time.Ticks for time in data.TimesList), dtype=np.int64))
+
+
+def format_time(time: np.datetime64) -> str:
+    return pd.Timestamp(time).isoformat()
+
+
+def get_time_step_index(
+    number_of_time_steps: int,
+    times: Optional[np.ndarray] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    stride: int = 1,
+) -> Optional[np.ndarray]:
+    """
+    Selects time steps within a window, taking every stride-th time step from the first in the window - generalises
+    timeStepSkippingNumber of the legacy extractor
+    :param number_of_time_steps: number of time steps of the result data
+    :param times: time of each time step - required where start or end are given
+    :param start: first time to include i.e. 2021-01-01T06:00:00 - None from the first time step
+    :param end: last time to include - None to the last time step
+    :param stride: interval between selected time steps
+    :return: original index of each selected time step - None where every time step is selected
+    """
+    if start is None and end is None and stride == 1:
+        return None
+    included = np.ones(number_of_time_steps, dtype=bool)
+    if start is not None:
+        included &= times >= np.datetime64(start)
+    if end is not None:
+        included &= times <= np.datetime64(end)
+    return np.flatnonzero(included)[::max(1, stride)]
+
+
+def get_effective_window(
+    time_steps: np.ndarray,
+    times: np.ndarray,
+    stride: int = 1,
+) -> Dict[str, any]:
+    """
+    Describes the time steps selected from a file so that the outputs can be reproduced
+    :param time_steps: original index of each selected time step
+    :param times: time of each time step of the file
+    :param stride: interval between selected time steps
+    :return: {"start", "end", "stride", "time_steps"} - start and end are None where no time step is selected
+    """
+    if not len(time_steps):
+        log.warning("No time steps within the time window - water levels are not available")
+    return {
+        "start": format_time(times[time_steps[0]]) if len(time_steps) else None,
+        "end": format_time(times[time_steps[-1]]) if len(time_steps) else None,
+        "stride": stride,
+        "time_steps": len(time_steps),
+    }
+
+
+if __name__ == "__main__":
+    pass
@@ -10,13 +10,29 @@ Created on 2021-10-27
 @email: edmund.bennett@ghd.com
 """
 
-from typing import List, Dict, Optional
-from csv import DictWriter
-from pyproj import Proj
-
-from dpc.analysis.convert_coordinate import convert_coordinate
+from typing import List, Dict, Tuple, Optional
+from math import isnan
+import csv
+import numpy as np
+
+from dpc.analysis.convert_coordinate import convert_coordinates
+from dpc.analysis.time_series_statistics import validate_statistics, get_output_column
+from dpc.analysis.ensemble import get_ensemble, FILENAME_REGEX
+from dpc.extraction.node_results import NodeResults
+from dpc.utils.instrumentation import get_rss_change_mb
 from dpc.utils.logger import logger as log
 
+INTEGER_COLUMNS = ["max_water_level_timing"]  # timestep indices - held as floats so that missing values are NaN
+CSV_COLUMNS = [  # leading columns of the unformatted output - value columns follow
+    "file",
+    "node_id",
+    "file_type",
+    "projection",
+    "x",
+    "y",
+    "invert_level",
+]
+
 
 def construct_log(
     full_file_path: str,
@@ -29,6 +45,8 @@ def construct_log(
     input_files: List[str] = None,
     critical_durations: List[str] = None,
     output_files: List[str] = None,
+    timings: Dict[str, any] = None,
+    time_windows: Dict[str, Dict[str, any]] = None,
 ) -> None:
     log.debug("Calling construct_log")
     with open(full_file_path, "w") as log_file:
@@ -52,141 +70,389 @@ def construct_log(
             log_file.write("\n")
             [log_file.write(f"{critical_duration}\n") for critical_duration in critical_durations]
 
+        if time_windows is not None:
+            log_file.write("\n")
+            log_file.write("time_windows:\n")
+            log_file.write("\n")
+            log_file.write(f"{'file':<40} {'start':<23} {'end':<23} {'stride':>6} {'time steps':>10}\n")
+            for file_name, time_window in time_windows.items():
+                log_file.write(
+                    f"{file_name:<40} {str(time_window['start']):<23} {str(time_window['end']):<23} "
+                    f"{time_window['stride']:>6} {time_window['time_steps']:>10}\n"
+                )
+
         if output_files is not None:
             log_file.write("\n")
             log_file.write("output_files:\n")
             log_file.write("\n")
             [log_file.write(f"{output_file}\n") for output_file in output_files]
 
+        if timings is not None:
+            log_file.write("\n")
+            log_file.write("timings:\n")
+            log_file.write("\n")
+            log_file.write(
+                f"{'stage':<20} {'file':<40} {'wall (s)':>10} {'cpu (s)':>10} {'rss change (MB)':>16} "
+                f"{'peak increase (MB)':>19} {'process peak so far (MB)':>25}\n"
+            )
+            for stage, totals in timings["summary"].items():
+                log_file.write(get_timing_line(stage, f"total of {totals['count']}", totals))
+            for record in timings["records"]:
+                if record["file"] is not None:
+                    log_file.write(get_timing_line(record["stage"], record["file"], record))
+
+
+def get_timing_line(stage: str, file: str, timing: Dict[str, any]) -> str:
+    rss_change_mb = timing["rss_change_mb"] if "rss_change_mb" in timing else get_rss_change_mb(timing)
+    memory = [
+        "-" if value is None else f"{value:.1f}"
+        for value in [rss_change_mb, timing["peak_rss_increase_mb"], timing["process_peak_rss_mb"]]
+    ]
+    return (
+        f"{stage:<20} {file:<40} {timing['wall_s']:>10.3f} {timing['cpu_s']:>10.3f} "
+        f"{memory[0]:>16} {memory[1]:>19} {memory[2]:>25}\n"
+    )
+
+
+def is_integer_column(column: str) -> bool:
+    return column in INTEGER_COLUMNS
+
+
+def get_output_value(
+    value: any,
+    round_decimals: bool = False,
+    as_integer: bool = False,
+) -> any:
+    """
+    Formats value for output - NaN is output as an empty value
+    :param value: value to format
+    :param round_decimals: round floats to three decimal places
+    :param as_integer: output floats as integers i.e. timestep indices
+    :return: formatted value
+    """
+    if isinstance(value, float):
+        if isnan(value):
+            return None
+        if as_integer:
+            return int(value)
+        if round_decimals:
+            return round(value, 3)
+    return value
+
 
 def construct_csv(
-    data: List[Dict[str, any]],
+    data: NodeResults,
     output_file_path_no_extension: str,
     ordered_data_files: List[str] = None,
     round_decimals: bool = False,
 ) -> None:
+    """
+    Writes one row per node per file
+    :param data: node results
+    :param output_file_path_no_extension: path of output file
+    :param ordered_data_files: order of files in output - files not listed follow in the order they were processed
+    :param round_decimals: round decimal outputs to three decimal places
+    """
     log.debug("Calling construct_csv")
 
-    preserve_order = [
-        "node_id",
-        "file_type",
-        "projection",
-        "x",
-        "y",
-        "invert_level",
+    value_columns = [column for column in data.column_names if column not in CSV_COLUMNS]
+
+    rows = np.arange(len(data))
+    if ordered_data_files is not None:
+        file_order = {data_file: i for i, data_file in reversed(list(enumerate(ordered_data_files)))}
+        file_ranks = np.array([file_order.get(data_file, len(file_order)) for data_file in data.files], dtype=np.int64)
+        if len(rows):
+            rows = np.argsort(file_ranks[data.file_codes], kind="stable")
+
+    file_codes = data.file_codes[rows].tolist()
+    node_codes = data.node_codes[rows].tolist()
+    output_columns = [
+        [data.files[file_code] for file_code in file_codes],
+        [data.node_ids[node_code] for node_code in node_codes],
+        [data.file_types[file_code] for file_code in file_codes],
+        [data.projections[file_code] for file_code in file_codes],
+    ] + [
+        [
+            get_output_value(value, round_decimals, is_integer_column(column))
+            for value in data.column(column)[rows].tolist()
+        ]
+        for column in ["x", "y", "invert_level"] + value_columns
     ]
 
-    column_names = list(set(
-        [column_name for datum in data for column_name in list(datum.keys()) if column_name not in preserve_order]
-    ))
-    ordered_column_names = []
-
-    if "file" in column_names:  # ensure file is at start
-        column_names.remove("file")
-        preserve_order = ["file"] + preserve_order
-
-    for data_file in ordered_data_files:
-        if data_file in column_names:
-            ordered_column_names.append(data_file)
-
-    if "max_of_max_level" in column_names:  # ensure max of max is almost at the end
-        column_names.remove("max_of_max_level")
-        ordered_column_names.append("max_of_max_level")
-
-    if "max_of_max_depth" in column_names:  # ensure depth is after max of max
-        column_names.remove("max_of_max_depth")
-        ordered_column_names.append("max_of_max_depth")
-
-    if "critical_duration" in column_names:  # ensure critical duration is after max_of_max_depth
-        column_names.remove("critical_duration")
-        ordered_column_names.append("critical_duration")
-
-    # takes data columns available for first item in list
-
-    all_column_names = preserve_order + ordered_column_names
-
-    if round_decimals:
-        for datum in data:
-            for k, v in datum.items():
-                if isinstance(v, float):
-                    datum[k] = round(v, 3)
-
     with open(output_file_path_no_extension, "w", newline="") as csv_file:
-        writer = DictWriter(csv_file, fieldnames=all_column_names)
-        writer.writeheader()
-        writer.writerows(data)
+        writer = csv.writer(csv_file)
+        writer.writerow(CSV_COLUMNS + value_columns)
+        writer.writerows(zip(*output_columns))
+
+
+class StreamingCsvWriter:
+    """
+    Writes the construct_csv layout one file at a time - rows are flushed as each file is written so that memory is
+    bounded by a single file and the output of an interrupted run holds every file completed. Value columns are those
+    of the configured statistics, as output by get_data, so that files without nodes do not change the header.
+    """
+
+    def __init__(
+        self,
+        output_file_path: str,
+        round_decimals: bool = False,
+        statistics: Optional[List[str]] = None,
+    ):
+        """
+        :param output_file_path: path of output file - overwritten
+        :param round_decimals: round decimal outputs to three decimal places
+        :param statistics: names of statistics extracted in addition to the defaults i.e. ["p95", "time_above_0.5"]
+        """
+        log.debug(f"Opening streamed output: {output_file_path}")
+        self.output_file_path = output_file_path
+        self.round_decimals = round_decimals
+        self.value_columns = [get_output_column(statistic) for statistic in validate_statistics(statistics)]
+        self.row_count = 0
+        self._csv_file = open(output_file_path, "w", newline="")
+        self._writer = csv.writer(self._csv_file)
+        self._writer.writerow(CSV_COLUMNS + self.value_columns)
+
+    def __enter__(self) -> "StreamingCsvWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write_file(
+        self,
+        file_name: str,
+        file_type: str,
+        projection: str,
+        nodes: Dict[str, Dict[str, any]],
+    ) -> None:
+        """
+        Writes the rows of a single file
+        :param file_name: name of file
+        :param file_type: file extension i.e. prf
+        :param projection: projection string of file
+        :param nodes: values of each node as output by get_data
+        """
+        columns = ["x", "y", "invert_level"] + self.value_columns
+        self._writer.writerows(
+            [file_name, node_id, file_type, projection]
+            + [
+                get_output_value(
+                    float(value) if isinstance(value, int) and not is_integer_column(column) else value,
+                    self.round_decimals,
+                    is_integer_column(column),
+                )
+                for column, value in ((column, values.get(column)) for column in columns)
+            ]
+            for node_id, values in nodes.items()
+        )
+        self._csv_file.flush()
+        self.row_count += len(nodes)
+
+    def close(self) -> None:
+        if not self._csv_file.closed:
+            log.debug(f"Closing streamed output: {self.output_file_path} with {self.row_count} rows")
+            self._csv_file.close()
+
+
+def get_node_parameters(
+    data: NodeResults,
+    row_index: np.ndarray,
+) -> Tuple[List[List[float]], List[Optional[str]]]:
+    """
+    Gets parameters of each node - taken from the first file in which the node is present, file type from the last
+    :param data: node results
+    :param row_index: row of each node and file in column order as output by NodeResults.get_ordered_row_index
+    :return: x, y and invert level of each node and file type of each node
+    """
+    present = row_index >= 0
+    node_codes = np.arange(len(data.node_ids))
+    has_data = present.any(axis=1)
+    first_rows, last_rows = np.full(len(node_codes), -1, dtype=np.int64), np.full(len(node_codes), -1, dtype=np.int64)
+    if present.size:
+        first_rows = np.where(has_data, row_index[node_codes, np.argmax(present, axis=1)], -1)
+        last_rows = np.where(has_data, row_index[node_codes, present.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)], -1)
+    node_parameters = [
+        np.where(has_data, data.column(parameter)[first_rows], np.nan).tolist()
+        for parameter in ["x", "y", "invert_level"]
+    ]
+    node_file_types = [
+        data.file_types[file_code] if row >= 0 else None
+        for row, file_code in zip(last_rows.tolist(), data.file_codes[last_rows].tolist())
+    ]
+    return node_parameters, node_file_types
 
 
 def construct_formatted_csv(
-    data: List[Dict[str, any]],
+    data: NodeResults,
     output_file_path_no_extension: str,
     critical_durations: Dict[str, Optional[str]] = None,
     ordered_data_files: List[str] = None,
     round_decimals: bool = False,
     timings: bool = False,
+    value_column: str = "max_water_level",
 ) -> None:
+    """
+    Writes one row per node with a column of maximum water levels (or another value) for each file
+    :param data: node results
+    :param output_file_path_no_extension: path of output file
+    :param critical_durations: critical duration of each file
+    :param ordered_data_files: order of file columns
+    :param round_decimals: round decimal outputs to three decimal places
+    :param timings: output timestep of maximum water levels in place of maximum water levels
+    :param value_column: column of node results to output for each file i.e. p95_water_level - summary columns are
+        only output for maximum water levels
+    """
     log.debug("Calling construct_formatted_csv")
 
-    parameters_to_include = [
+    if timings:
+        value_column = "max_water_level_timing"
+    is_maximum = value_column == "max_water_level"
+    as_integer = is_integer_column(value_column)
+
+    if critical_durations is None:
+        critical_durations = {}
+    if ordered_data_files is None:
+        ordered_data_files = data.files
+
+    # pivot rows to nodes x ordered files
+
+    row_index = data.get_ordered_row_index(ordered_data_files)
+    present = row_index >= 0
+
+    max_water_levels = np.where(present, data.column("max_water_level")[row_index], np.nan)
+    output_values = max_water_levels
+    if not is_maximum:
+        output_values = np.where(present, data.column(value_column)[row_index], np.nan)
+
+    node_parameters, node_file_types = get_node_parameters(data, row_index)
+
+    # max of max over files - the critical file is the first in column order on ties
+
+    has_file_maxima = ~np.isnan(max_water_levels).all(axis=1)
+    max_of_max_levels = np.full(len(data.node_ids), np.nan)
+    critical_columns = np.full(len(data.node_ids), -1, dtype=np.int64)
+    if has_file_maxima.any():
+        max_of_max_levels[has_file_maxima] = np.nanmax(max_water_levels[has_file_maxima], axis=1)
+        critical_columns[has_file_maxima] = np.nanargmax(max_water_levels[has_file_maxima], axis=1)
+    max_of_max_depths = max_of_max_levels - np.asarray(node_parameters[2], dtype=np.float64)
+    node_critical_durations = [
+        critical_durations.get(ordered_data_files[j]) if j >= 0 else None for j in critical_columns.tolist()
+    ]
+    max_of_max_levels, max_of_max_depths = max_of_max_levels.tolist(), max_of_max_depths.tolist()
+
+    # columns
+
+    file_columns = [j for j in range(len(ordered_data_files)) if present[:, j].any()]
+    has_nodes = len(data.node_ids) > 0
+    has_maxima = bool(has_file_maxima.any())
+    column_names = [
+        "node_id",
+        "file_type",
+        "projection",
         "x",
         "y",
-        "invert_level"
-    ]
+        "invert_level",
+    ] + [ordered_data_files[j] for j in file_columns]
+    if is_maximum and has_nodes:
+        column_names.append("max_of_max_level")
+        if has_maxima:
+            column_names.append("max_of_max_depth")
+        column_names.append("critical_duration")
 
-    def seek_data(node_id, file):
-        for datum in data:
-            if node_id == datum["node_id"] and file == datum["file"]:
-                return datum
-
-    # get unique list of nodes
-
-    unique_nodes = list(set([datum["node_id"] for datum in data]))
-
-    formatted_data = []
-    for unique_node in unique_nodes:
-        node_parameters_set = False
-        file_maxima = []
-        node_outputs = {
-            "node_id": unique_node,
-        }
-        for i, unique_file in enumerate(ordered_data_files):
-            datum = seek_data(unique_node, unique_file)
-            if datum is not None and datum["max_water_level"] is not None:
-                file_maxima.append(datum["max_water_level"])
-            if datum is not None:
-                if not node_parameters_set:
-                    for param in parameters_to_include:
-                        node_outputs[param] = datum[param]
-                    node_parameters_set = True
-                node_outputs[unique_file] = datum["max_water_level"] if not timings else datum["max_water_level_timing"]
-                node_outputs["file_type"] = datum["file_type"]
-
-        if not timings:
-            node_outputs["max_of_max_level"] = None
-            node_outputs["critical_duration"] = None
-            if file_maxima:
-                max_file_maxima = max(file_maxima)
-                max_of_max_depth = max_file_maxima - node_outputs["invert_level"]
-                critical_files = [s for s in node_outputs if node_outputs[s] == max_file_maxima]
-                if critical_files:
-                    node_outputs["critical_duration"] = critical_durations[critical_files[0]]
-                node_outputs["max_of_max_level"] = max_file_maxima
-                node_outputs["max_of_max_depth"] = max_of_max_depth
-        formatted_data.append(
-            node_outputs
-        )
+    with open(output_file_path_no_extension, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(column_names)
+        for node_code, node_id in enumerate(data.node_ids):
+            x, y, invert_level = [parameter[node_code] for parameter in node_parameters]
+            node_values = output_values[node_code].tolist()
+            row = [node_id, node_file_types[node_code], None] + [
+                get_output_value(value, round_decimals) for value in [x, y, invert_level]
+            ] + [
+                get_output_value(node_values[j], round_decimals, as_integer=as_integer) for j in file_columns
+            ]
+
+            if is_maximum and has_nodes:
+                row.append(get_output_value(max_of_max_levels[node_code], round_decimals))
+                if has_maxima:
+                    row.append(get_output_value(max_of_max_depths[node_code], round_decimals))
+                row.append(node_critical_durations[node_code])
+
+            writer.writerow(row)
+
+
+def construct_ensemble_csv(
+    data: NodeResults,
+    output_file_path_no_extension: str,
+    ordered_data_files: List[str] = None,
+    statistic: str = "median",
+    filename_regex: str = FILENAME_REGEX,
+    round_decimals: bool = False,
+) -> None:
+    """
+    Writes one row per node with, for each AEP, the maximum water level of each duration reduced over temporal
+    patterns followed by the critical level, depth and duration
+    :param data: node results
+    :param output_file_path_no_extension: path of output file
+    :param ordered_data_files: files to include - files not named by AEP and duration are left out
+    :param statistic: reduction over temporal patterns - one of median, mean, max or min
+    :param filename_regex: regular expression with named groups aep and duration and optionally unit and pattern
+    :param round_decimals: round decimal outputs to three decimal places
+    """
+    log.debug("Calling construct_ensemble_csv")
+
+    if ordered_data_files is None:
+        ordered_data_files = data.files
+
+    row_index = data.get_ordered_row_index(ordered_data_files)
+    max_water_levels = np.where(row_index >= 0, data.column("max_water_level")[row_index], np.nan)
+    node_parameters, node_file_types = get_node_parameters(data, row_index)
+    invert_levels = np.asarray(node_parameters[2], dtype=np.float64)
+    ensemble = get_ensemble(max_water_levels, ordered_data_files, statistic, filename_regex)
+
+    column_names = ["node_id", "file_type", "projection", "x", "y", "invert_level"]
+    output_columns = []
+    for aep in ensemble:
+        column_names += [f"{aep['aep']}AEP_{duration}" for duration in aep["durations"]]
+        column_names += [f"{aep['aep']}AEP_critical_level", f"{aep['aep']}AEP_critical_depth", f"{aep['aep']}AEP_critical_duration"]
+        output_columns += [
+            [get_output_value(value, round_decimals) for value in column.tolist()] for column in aep["levels"].T
+        ] + [
+            [get_output_value(value, round_decimals) for value in aep["critical_levels"].tolist()],
+            [get_output_value(value, round_decimals) for value in (aep["critical_levels"] - invert_levels).tolist()],
+            [aep["durations"][j] if j >= 0 else None for j in aep["critical_durations"].tolist()],
+        ]
 
-    construct_csv(
-        formatted_data,
-        output_file_path_no_extension,
-        ordered_data_files=ordered_data_files,
-        round_decimals=round_decimals,
-    )
+    with open(output_file_path_no_extension, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(column_names)
+        writer.writerows(zip(
+            data.node_ids,
+            node_file_types,
+            [None] * len(data.node_ids),
+            *[[get_output_value(value, round_decimals) for value in parameter] for parameter in node_parameters],
+            *output_columns,
+        ))
+
+
+def construct_merged_nodes_csv(
+    merged_node_ids: Dict[str, str],
+    output_file_path_no_extension: str,
+) -> None:
+    """
+    Writes the id of each node merged by a spatial join and the id of the node it was merged into
+    :param merged_node_ids: {node_id: merged_into}
+    :param output_file_path_no_extension: path of output file
+    """
+    log.debug("Calling construct_merged_nodes_csv")
+    with open(output_file_path_no_extension, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["node_id", "merged_into"])
+        writer.writerows(merged_node_ids.items())
 
 
 def construct_geojson(
     from_crs: str,
-    nodes: List[Dict[str, any]],
+    nodes: NodeResults,
 ) -> Dict[str, any]:
     log.info("Calling construct_geojson")
 
@@ -195,23 +461,27 @@ def construct_geojson(
         "features": []
     }
 
-    from_crs_proj = Proj(from_crs, preserve_units=False)
-    to_crs_proj = Proj("epsg:4326", preserve_units=False)
+    longitudes, latitudes = convert_coordinates(
+        from_crs,
+        "epsg:4326",
+        nodes.column("x"),
+        nodes.column("y"),
+    )
 
-    for node in nodes:
-        long, lat = convert_coordinate(
-            from_crs_proj,
-            to_crs_proj,
-            node["x"],
-            node["y"],
-        )
+    for file_code, node_code, long, lat, invert_level in zip(
+        nodes.file_codes.tolist(),
+        nodes.node_codes.tolist(),
+        longitudes.tolist(),
+        latitudes.tolist(),
+        nodes.column("invert_level").tolist(),
+    ):
         geojson["features"].append(
             {
                 "type": "Feature",
                 "properties": {
-                    "file": node["file"],
-                    "node_id": node["node_id"],
-                    "invert_level": node["invert_level"],
+                    "file": nodes.files[file_code],
+                    "node_id": nodes.node_ids[node_code],
+                    "invert_level": get_output_value(invert_level),
                 },
                 "geometry": {
                     "type": "Point",
@@ -0,0 +1,121 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Dict, Tuple, Optional
+from json import loads, JSONDecodeError
+import csv
+import re
+
+from dpc.utils.logger import logger as log
+
+NODE_COLUMNS = ["node_id", "file_type", "projection", "x", "y", "invert_level"]  # leading columns of formatted output
+SUMMARY_COLUMNS = ["max_of_max_level", "max_of_max_depth", "critical_duration"]
+LOG_SECTION_REGEX = r"^([a-z_]+):$"
+
+
+def read_log(full_file_path: str) -> Tuple[List[str], List[Optional[str]]]:
+    """
+    Reads input files and critical durations from a log written by construct_log (or the JSON log written at the start
+    of a run)
+    :param full_file_path: path of log file
+    :return: input file paths and critical duration of each input file
+    """
+    log.debug(f"Reading log: {full_file_path}")
+    with open(full_file_path, "r") as log_file:
+        content = log_file.read()
+
+    try:
+        payload = loads(content)
+        input_files = payload.get("input_files") or []
+        critical_durations = payload.get("critical_durations") or [None for _ in input_files]
+        return input_files, critical_durations
+    except JSONDecodeError:
+        pass
+
+    sections = {}
+    section = None
+    for line in content.split("\n"):
+        match = re.match(LOG_SECTION_REGEX, line.strip())
+        if match:
+            section = sections[match.group(1)] = []
+        elif section is not None and line.strip():
+            section.append(line.strip())
+
+    input_files = sections.get("input_files", [])
+    critical_durations = [None if e == "None" else e for e in sections.get("critical_durations", [])]
+    if len(critical_durations) != len(input_files):
+        critical_durations = [None for _ in input_files]
+    return input_files, critical_durations
+
+
+def read_formatted_csv(
+    full_file_path: str,
+    value_column: str = "max_water_level",
+    file_data: Dict[str, Dict[str, Dict[str, any]]] = None,
+) -> Dict[str, Dict[str, Dict[str, any]]]:
+    """
+    Reads a formatted output back to the values of each node of each file - the inverse of construct_formatted_csv.
+    Node parameters are written once per node so are applied to every file. A node present in a file without a value
+    is read as present in the first file matching its file type.
+    :param full_file_path: path of formatted csv
+    :param value_column: name given to the file column values i.e. max_water_level_timing for a timing output
+    :param file_data: values previously read i.e. from the maximum water level output - the values of this file are added
+    :return: {file_name: {node_id: {"x", "y", "invert_level", value_column}}} with files in column order
+    """
+    log.debug(f"Reading formatted csv: {full_file_path}")
+    as_integer = value_column == "max_water_level_timing"
+    if file_data is None:
+        file_data = {}
+
+    with open(full_file_path, "r", newline="") as csv_file:
+        reader = csv.reader(csv_file)
+        column_names = next(reader, [])
+        file_columns = [
+            (j, column) for j, column in enumerate(column_names)
+            if column not in NODE_COLUMNS and column not in SUMMARY_COLUMNS
+        ]
+        for _, data_file in file_columns:
+            file_data.setdefault(data_file, {})
+
+        for row in reader:
+            if not row:
+                continue
+            values = dict(zip(column_names, row))
+            node_parameters = {parameter: get_input_value(values.get(parameter)) for parameter in ["x", "y", "invert_level"]}
+            node_id = values["node_id"]
+            present_files = [data_file for j, data_file in file_columns if j < len(row) and row[j] != ""]
+            if not present_files and file_columns:
+                file_type = values.get("file_type", "").lower()
+                present_files = [
+                    next((data_file for _, data_file in file_columns if data_file.lower().endswith(f".{file_type}")),
+                         file_columns[0][1])
+                ]
+            for j, data_file in file_columns:
+                if data_file not in present_files:
+                    continue
+                node_values = file_data[data_file].setdefault(node_id, dict(node_parameters))
+                node_values[value_column] = get_input_value(row[j] if j < len(row) else "", as_integer)
+
+    return file_data
+
+
+def get_input_value(
+    value: Optional[str],
+    as_integer: bool = False,
+) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return int(float(value)) if as_integer else float(value)
+
+
+if __name__ == "__main__":
+    pass
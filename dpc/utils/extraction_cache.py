@@ -0,0 +1,207 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import Dict, Optional
+from os import makedirs, stat
+from os.path import abspath, join
+from hashlib import sha256
+from json import dumps, loads
+from time import time
+import sqlite3
+import zlib
+
+from dpc.utils.logger import logger as log
+
+
+class ExtractionCache:
+    """
+    On-disk cache of data extracted from result files, held in a SQLite database. Entries are keyed by file path, size
+    and modification time (and optionally a hash of the file contents) so that a changed file is never served from the
+    cache. The least recently used entries are evicted once the cache exceeds its size limit.
+    """
+    DATABASE_NAME = "extraction_cache.sqlite"
+    VERSION = 4  # increment when the extracted data changes so that stale entries are not used - 3: res11 grid points
+    # matched by nearest chainage within a tolerance, res11 water levels read as float32, depth statistics in hours
+    # 4: depth statistics weighted by the trapezoidal rule
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        cache_directory: str,
+        max_size_bytes: int,
+        use_content_hash: bool = False,
+        refresh: bool = False,
+    ):
+        """
+        :param cache_directory: directory in which to keep the cache database - created if it does not exist
+        :param max_size_bytes: size limit of cached payloads beyond which least recently used entries are evicted
+        :param use_content_hash: include a hash of the file contents in the key - reads every file in full
+        :param refresh: ignore existing entries - files are extracted again and their entries replaced
+        """
+        makedirs(cache_directory, exist_ok=True)
+        self.database_path = join(cache_directory, ExtractionCache.DATABASE_NAME)
+        self.max_size_bytes = max_size_bytes
+        self.use_content_hash = use_content_hash
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(self.database_path, timeout=60)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    def get_key(
+        self,
+        file_path: str,
+        options: Dict[str, any] = None,
+    ) -> str:
+        """
+        Gets cache key of file - changes if the file is modified or if extraction options differ
+        :param file_path: path to result file
+        :param options: extraction options affecting the extracted data
+        :return: cache key
+        """
+        file_path = abspath(file_path)
+        file_stat = stat(file_path)
+        key = [
+            ExtractionCache.VERSION,
+            file_path,
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+            self.get_content_hash(file_path) if self.use_content_hash else None,
+            options,
+        ]
+        return sha256(dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_content_hash(file_path: str) -> str:
+        content_hash = sha256()
+        with open(file_path, "rb") as result_file:
+            for chunk in iter(lambda: result_file.read(ExtractionCache.HASH_CHUNK_SIZE), b""):
+                content_hash.update(chunk)
+        return content_hash.hexdigest()
+
+    def contains(
+        self,
+        file_path: str,
+        options: Dict[str, any] = None,
+    ) -> bool:
+        """
+        Checks for a valid entry without reading its payload - a missing entry is counted as a miss
+        :param file_path: path to result file
+        :param options: extraction options affecting the extracted data
+        :return: True if get would return the payload of file (unless evicted in the meantime)
+        """
+        found = False
+        if not self.refresh:
+            try:
+                key = self.get_key(file_path, options)
+                found = self.connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+            except OSError:
+                log.warning(f"Unable to read file for cache key: {file_path}")
+        if not found:
+            self.misses += 1
+            log.debug(f"Cache miss for file: {file_path}")
+        return found
+
+    def get(
+        self,
+        file_path: str,
+        options: Dict[str, any] = None,
+    ) -> Optional[any]:
+        """
+        Gets cached payload of file
+        :param file_path: path to result file
+        :param options: extraction options affecting the extracted data
+        :return: payload or None if there is no valid entry
+        """
+        payload = None
+        if not self.refresh:
+            try:
+                key = self.get_key(file_path, options)
+            except OSError:
+                log.warning(f"Unable to read file for cache key: {file_path}")
+                key = None
+            row = None
+            if key is not None:
+                row = self.connection.execute("SELECT payload FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                payload = loads(zlib.decompress(row[0]).decode("utf-8"))
+                self.connection.execute("UPDATE entries SET last_accessed = ? WHERE key = ?", (time(), key))
+                self.connection.commit()
+
+        if payload is None:
+            self.misses += 1
+            log.debug(f"Cache miss for file: {file_path}")
+        else:
+            self.hits += 1
+            log.debug(f"Cache hit for file: {file_path}")
+        return payload
+
+    def put(
+        self,
+        file_path: str,
+        payload: any,
+        options: Dict[str, any] = None,
+    ) -> None:
+        """
+        Caches payload of file - payload must be JSON serialisable
+        :param file_path: path to result file
+        :param payload: data extracted from file
+        :param options: extraction options affecting the extracted data
+        """
+        compressed_payload = zlib.compress(dumps(payload).encode("utf-8"))
+        if len(compressed_payload) > self.max_size_bytes:
+            log.warning(f"Extracted data exceeds cache size - not caching file: {file_path}")
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries (key, file_path, payload, size, last_accessed) VALUES (?, ?, ?, ?, ?)",
+            (self.get_key(file_path, options), abspath(file_path), compressed_payload, len(compressed_payload), time()),
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Evicts least recently used entries until the cache is within its size limit
+        """
+        total_size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        evicted_keys = []
+        for key, size in self.connection.execute("SELECT key, size FROM entries ORDER BY last_accessed ASC").fetchall():
+            if total_size <= self.max_size_bytes:
+                break
+            evicted_keys.append((key,))
+            total_size -= size
+
+        log.debug(f"Evicting {len(evicted_keys)} cache entries")
+        self.connection.executemany("DELETE FROM entries WHERE key = ?", evicted_keys)
+        self.connection.commit()
+
+    def close(self) -> None:
+        log.info(f"Extraction cache hits: {self.hits} misses: {self.misses}")
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    pass
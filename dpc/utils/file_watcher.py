@@ -0,0 +1,104 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Dict, Tuple, Callable, Iterator, Iterable, Optional
+from os import stat
+from time import time, sleep
+
+from dpc.utils.logger import logger as log
+
+
+class FileWatcher:
+    """
+    Polls for input files and reports each once it is complete - a file is taken to be complete once its size and
+    modification time are unchanged between polls and it has not been modified for the stable time. Files are reported
+    once only - changes to a file after it has been reported are logged but not reported again.
+    """
+
+    def __init__(
+        self,
+        get_file_paths: Callable[[], List[str]],
+        stable_seconds: float = 30.0,
+        poll_interval: float = 10.0,
+        known_file_paths: Iterable[str] = None,
+    ):
+        """
+        :param get_file_paths: lists the current input files i.e. get_input_paths of the watched directory
+        :param stable_seconds: time since last modification after which a file is taken to be complete
+        :param poll_interval: time between polls in seconds
+        :param known_file_paths: files already processed - these are not reported
+        """
+        self.get_file_paths = get_file_paths
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._reported: Dict[str, Optional[Tuple[int, int]]] = {file_path: None for file_path in known_file_paths or []}
+
+    def poll(self) -> Tuple[List[str], bool]:
+        """
+        Lists input files once
+        :return: paths of files newly complete in listing order and whether any file is still being written
+        """
+        now = time()
+        ready_file_paths = []
+        pending = False
+        for file_path in self.get_file_paths():
+            try:
+                file_stat = stat(file_path)
+            except OSError:  # removed since listing
+                continue
+            signature = (file_stat.st_size, file_stat.st_mtime_ns)
+            previous_signature = self._signatures.get(file_path)
+            self._signatures[file_path] = signature
+
+            if file_path in self._reported:
+                reported_signature = self._reported[file_path]
+                if reported_signature is not None and signature != reported_signature:
+                    log.warning(f"File changed after it was summarised - rerun to include changes: {file_path}")
+                    self._reported[file_path] = signature  # warn once per change
+                continue
+
+            is_stable = previous_signature is None or previous_signature == signature
+            if is_stable and now - file_stat.st_mtime_ns / 1e9 >= self.stable_seconds:
+                ready_file_paths.append(file_path)
+                self._reported[file_path] = signature
+            else:
+                pending = True
+
+        return ready_file_paths, pending
+
+    def watch(
+        self,
+        idle_timeout: Optional[float] = None,
+    ) -> Iterator[List[str]]:
+        """
+        Polls until no file has been reported or pending for the idle timeout
+        :param idle_timeout: seconds without new or pending files after which to stop - None watches until interrupted
+        :return: paths of files newly complete on each poll that finds any
+        """
+        log.info(f"Watching for input files every {self.poll_interval} s")
+        last_activity = time()
+        while True:
+            ready_file_paths, pending = self.poll()
+            if ready_file_paths or pending:
+                last_activity = time()
+            if ready_file_paths:
+                log.info(f"{len(ready_file_paths)} new input files complete")
+                yield ready_file_paths
+            elif idle_timeout is not None and time() - last_activity >= idle_timeout:
+                log.info(f"No new input files for {idle_timeout} s - stopping watch")
+                return
+            sleep(self.poll_interval)
+
+
+if __name__ == "__main__":
+    pass
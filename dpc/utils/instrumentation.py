@@ -0,0 +1,215 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+from typing import List, Dict, Optional, Iterator
+from contextlib import contextmanager
+from time import perf_counter, process_time
+from os import getpid
+import gc
+import sys
+
+from dpc.utils.logger import logger as log
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def get_process_memory_counters():
+    """Gets the memory counters of the current process on Windows - None if not available"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+    get_process_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_process_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not get_process_memory_info(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def get_current_rss_mb() -> Optional[float]:
+    """
+    Gets the current resident set size (working set on Windows) of the current process
+    :return: RSS in MB - None if not available on this platform
+    """
+    try:
+        if sys.platform == "win32":
+            counters = get_process_memory_counters()
+            return None if counters is None else counters.WorkingSetSize / 1024 / 1024
+        if sys.platform.startswith("linux"):
+            from os import sysconf
+
+            with open("/proc/self/statm", "r") as statm:
+                return int(statm.read().split()[1]) * sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except Exception as e:
+        log.debug(f"RSS not available: {e}")
+    return None
+
+
+def get_rss_mb() -> Optional[float]:
+    """
+    Gets the current resident set size (working set on Windows) of the current process
+    :return: RSS in MB - the peak RSS where the current RSS is not available on this platform
+    """
+    rss_mb = get_current_rss_mb()
+    return get_peak_rss_mb() if rss_mb is None else rss_mb
+
+
+def check_memory_budget(
+    memory_budget_mb: Optional[float],
+    context: str = "",
+) -> None:
+    """
+    Raises MemoryBudgetExceeded if the RSS of the current process exceeds the budget once garbage has been collected
+    :param memory_budget_mb: budget in MB - None does not check
+    :param context: description of where the budget is checked for the error message i.e. the file just processed
+    """
+    if memory_budget_mb is None:
+        return
+    rss_mb = get_rss_mb()
+    if rss_mb is not None and rss_mb > memory_budget_mb:
+        gc.collect()
+        rss_mb = get_rss_mb()
+    if rss_mb is not None and rss_mb > memory_budget_mb:
+        raise MemoryBudgetExceeded(
+            f"Memory of process {getpid()} is {rss_mb:.0f} MB, exceeding the budget of {memory_budget_mb:.0f} MB"
+            + (f" after {context}" if context else "")
+        )
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """
+    Gets the peak resident set size (working set on Windows) of the current process
+    :return: peak RSS in MB - None if not available on this platform
+    """
+    try:
+        if sys.platform == "win32":
+            counters = get_process_memory_counters()
+            return None if counters is None else counters.PeakWorkingSetSize / 1024 / 1024
+
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+    except Exception as e:
+        log.debug(f"Peak RSS not available: {e}")
+        return None
+
+
+def get_rss_change_mb(record: Dict[str, any]) -> Optional[float]:
+    """Change of RSS over a stage record - None if RSS is not available on this platform"""
+    if record.get("start_rss_mb") is None or record.get("end_rss_mb") is None:
+        return None
+    return record["end_rss_mb"] - record["start_rss_mb"]
+
+
+class Instrumentation:
+    """
+    Records wall time, CPU time and memory of each stage of a run, optionally per input file. Memory is recorded as the
+    RSS at the start and end of the stage, the increase of the process peak RSS during the stage - memory the stage
+    took beyond any earlier stage - and the process peak RSS so far. Records made in worker processes are returned with
+    their results and merged with extend.
+    """
+
+    def __init__(self):
+        self.records: List[Dict[str, any]] = []
+
+    @contextmanager
+    def stage(self, name: str, file: str = None) -> Iterator[None]:
+        """
+        Times the enclosed block
+        :param name: name of stage i.e. load
+        :param file: input file the stage applies to - None for stages spanning all files
+        """
+        start_rss_mb, start_peak_rss_mb = get_current_rss_mb(), get_peak_rss_mb()
+        start, start_cpu = perf_counter(), process_time()
+        try:
+            yield
+        finally:
+            end_peak_rss_mb = get_peak_rss_mb()
+            record = {
+                "stage": name,
+                "file": file,
+                "wall_s": round(perf_counter() - start, 6),
+                "cpu_s": round(process_time() - start_cpu, 6),  # of this process only
+                "start_rss_mb": start_rss_mb,
+                "end_rss_mb": get_current_rss_mb(),
+                "peak_rss_increase_mb": (
+                    None if start_peak_rss_mb is None or end_peak_rss_mb is None
+                    else max(0.0, end_peak_rss_mb - start_peak_rss_mb)
+                ),
+                "process_peak_rss_mb": end_peak_rss_mb,  # high-water mark of the process so far, not of this stage
+                "pid": getpid(),
+            }
+            log.debug(f"Stage {name}{'' if file is None else f' of {file}'} took {record['wall_s']:.3f} s")
+            self.records.append(record)
+
+    def extend(self, records: List[Dict[str, any]]) -> None:
+        self.records.extend(records)
+
+    def get_summary(self) -> Dict[str, Dict[str, any]]:
+        """
+        Totals of each stage over all files
+        :return: {stage: {"count", "wall_s", "cpu_s", "rss_change_mb", "peak_rss_increase_mb", "process_peak_rss_mb"}}
+            in order of first occurrence - RSS changes and peak increases are summed, process peak is the largest
+        """
+        summary = {}
+        for record in self.records:
+            totals = summary.setdefault(
+                record["stage"],
+                {
+                    "count": 0,
+                    "wall_s": 0.0,
+                    "cpu_s": 0.0,
+                    "rss_change_mb": None,
+                    "peak_rss_increase_mb": None,
+                    "process_peak_rss_mb": None,
+                },
+            )
+            totals["count"] += 1
+            totals["wall_s"] = round(totals["wall_s"] + record["wall_s"], 6)
+            totals["cpu_s"] = round(totals["cpu_s"] + record["cpu_s"], 6)
+            rss_change_mb = get_rss_change_mb(record)
+            if rss_change_mb is not None:
+                totals["rss_change_mb"] = (totals["rss_change_mb"] or 0.0) + rss_change_mb
+            if record["peak_rss_increase_mb"] is not None:
+                totals["peak_rss_increase_mb"] = (totals["peak_rss_increase_mb"] or 0.0) + record["peak_rss_increase_mb"]
+            if record["process_peak_rss_mb"] is not None:
+                totals["process_peak_rss_mb"] = max(totals["process_peak_rss_mb"] or 0.0, record["process_peak_rss_mb"])
+        return summary
+
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            "summary": self.get_summary(),
+            "records": self.records,
+        }
+
+
+if __name__ == "__main__":
+    pass
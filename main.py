@@ -10,25 +10,46 @@ Created on 2021-10-26
 @email: edmund.bennett@ghd.com
 """
 
-from typing import List, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator, Iterable, Callable
 from sys import argv, exit
-from os.path import abspath, join, split, isdir
+from os.path import abspath, join, split, isdir, isfile
 from os import getcwd
 from json import dump
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Executor
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
+from multiprocessing import freeze_support
+import tempfile
 import argparse
+import re
 import getpass
 import socket
 import warnings
 
-from dpc.extraction.load_mike_file import load_prf_file, load_res_file
-from dpc.extraction.extract_parameters import get_data
+from dpc.extraction.load_mike_file import load_prf_file, load_res_file, ResultFile, FileStager
+from dpc.extraction.extract_parameters import get_data, CHAINAGE_TOLERANCE
+from dpc.extraction.node_results import NodeResults
+from dpc.extraction.subset import read_id_list, get_loader_ids
+from dpc.extraction.time_window import get_result_times, get_time_step_index, get_effective_window
+from dpc.analysis.ensemble import fill_critical_durations, FILENAME_REGEX, ENSEMBLE_STATISTICS
+from dpc.analysis.spatial_join import spatial_join
+from dpc.analysis.time_series_statistics import DEFAULT_STATISTICS, validate_statistics, get_output_column
 from dpc.output.create_output_files import (
+    StreamingCsvWriter,
     construct_formatted_csv,
+    construct_ensemble_csv,
+    construct_merged_nodes_csv,
     construct_log,
     construct_geojson,
 )
+from dpc.output.read_output_files import read_formatted_csv, read_log
+from dpc.utils.extraction_cache import ExtractionCache
+from dpc.utils.file_watcher import FileWatcher
 from dpc.utils.get_files_recursively import FileManipulation
+from dpc.utils.instrumentation import Instrumentation, MemoryBudgetExceeded, check_memory_budget, get_peak_rss_mb
 from dpc.utils.logger import logger as log
 
 
@@ -43,6 +64,7 @@ def parse_arguments() -> Tuple[
     Optional[str],
     Optional[bool],
     Optional[bool],
+    Optional[argparse.Namespace],
 ]:
 
     def get_file_list(path_to_file_list):
@@ -137,10 +159,255 @@ def parse_arguments() -> Tuple[
         action="store_true",
     )
 
+    parser.add_argument(
+        "--chainage-tolerance",
+        type=float,
+        help=f'maximum distance down a reach between a res11 grid point and the water level point matched to it (default {CHAINAGE_TOLERANCE})',
+        default=CHAINAGE_TOLERANCE,
+        dest="chainage_tolerance",
+    )
+
+    parser.add_argument(
+        "--statistics",
+        type=str,
+        nargs="+",
+        help='additional water level statistics, each output to FILENAME_STATISTIC.csv i.e. p95 time_above_0.5 - one of min, mean, depth_integral (metre hours), pNN or time_above_DEPTH (hours)',
+        default=[],
+        dest="statistics",
+    )
+
+    parser.add_argument(
+        "--start",
+        type=str,
+        help='first time of the window of time steps from which water level statistics are computed i.e. 2021-01-01T06:00:00 - defaults to the start of each file',
+        default=None,
+        dest="start",
+    )
+
+    parser.add_argument(
+        "--end",
+        type=str,
+        help='last time of the window of time steps from which water level statistics are computed i.e. 2021-01-02T06:00:00 - defaults to the end of each file',
+        default=None,
+        dest="end",
+    )
+
+    parser.add_argument(
+        "--stride",
+        type=int,
+        help='use every STRIDE-th time step of the window, counted from its first time step - timings remain time steps of the file',
+        default=1,
+        dest="stride",
+    )
+
+    parser.add_argument(
+        "--subset-ids",
+        type=str,
+        help='path of text file listing the node, grid point or reach ids to extract, one per line - only these are loaded and output',
+        default=None,
+        dest="subset_ids",
+    )
+
+    parser.add_argument(
+        "--subset-regex",
+        type=str,
+        help='extract only nodes and grid points whose id contains a match of this regular expression i.e. "^SUMN\\.Junction"',
+        default=None,
+        dest="subset_regex",
+    )
+
+    parser.add_argument(
+        "--subset-bbox",
+        type=float,
+        nargs=4,
+        metavar=("XMIN", "YMIN", "XMAX", "YMAX"),
+        help='extract only nodes and grid points within this bounding box - in the units of the input projection',
+        default=None,
+        dest="subset_bbox",
+    )
+
+    parser.add_argument(
+        "--ensemble",
+        type=str,
+        nargs="?",
+        help='write FILENAME_ensemble.csv with the critical duration of each AEP of files named by AEP, duration and temporal pattern - temporal patterns are reduced with this statistic (default median)',
+        default=None,
+        const="median",
+        choices=list(ENSEMBLE_STATISTICS),
+        dest="ensemble_statistic",
+    )
+
+    parser.add_argument(
+        "--filename-regex",
+        type=str,
+        help='regular expression with named groups aep, duration and optionally unit and pattern by which AEP, duration and temporal pattern are read from file names - durations of files not given one in the file list are also read from file names',
+        default=FILENAME_REGEX,
+        dest="filename_regex",
+    )
+
+    parser.add_argument(
+        "--spatial-join",
+        type=float,
+        help='merge nodes of different files within this distance of each other into a single row i.e. 0.5 - in the units of the input projection',
+        default=None,
+        dest="spatial_join_tolerance",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help='number of worker processes with which to load and process input files i.e. 8 - defaults to a single process',
+        default=1,
+        dest="jobs",
+    )
+
+    parser.add_argument(
+        "--cache-directory",
+        type=str,
+        help='directory in which to cache data extracted from input files between runs - defaults to the temporary directory',
+        default=join(tempfile.gettempdir(), "dpc_cache"),
+        dest="cache_directory",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        help='maximum size of the cache in MB - least recently used entries are evicted beyond this',
+        default=2048,
+        dest="cache_size",
+    )
+
+    parser.add_argument(
+        "--cache-content-hash",
+        help='include a hash of the file contents in cache keys, in addition to file path, size and modification time',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        help='do not read from or write to the cache',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--refresh-cache",
+        help='ignore cached data - all input files are loaded and their cache entries replaced',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--update",
+        help='add input files not already in an existing OUTPUT_NAME.csv and .log to those outputs - only the new files are loaded',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--watch",
+        help='watch the input directory, summarising each input file once complete and updating outputs as files are added - stops after --idle-timeout or when interrupted with ctrl+c',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        help='seconds between checks of the input directory when watching',
+        default=10.0,
+        dest="poll_interval",
+    )
+
+    parser.add_argument(
+        "--stable-time",
+        type=float,
+        help='seconds since last modification after which an input file is taken to be complete when watching',
+        default=30.0,
+        dest="stable_time",
+    )
+
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help='stop watching after this many seconds without new input files - defaults to watching until interrupted',
+        default=None,
+        dest="idle_timeout",
+    )
+
+    parser.add_argument(
+        "--stream",
+        help='write one row per node per file to FILENAME_node_data.csv as each file is processed, holding only one file in memory - formatted csv and geojson outputs are not produced',
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--stage-directory",
+        type=str,
+        help='local scratch directory to which input files are copied ahead of loading i.e. when inputs are on a network share - staging is used with a single process only',
+        default=None,
+        dest="stage_directory",
+    )
+
+    parser.add_argument(
+        "--stage-ahead",
+        type=int,
+        help='number of input files to copy to the stage directory ahead of the file being processed',
+        default=2,
+        dest="stage_ahead",
+    )
+
+    parser.add_argument(
+        "--stage-size",
+        type=int,
+        help='maximum size in MB of files held in the stage directory - larger files are loaded in place',
+        default=4096,
+        dest="stage_size",
+    )
+
+    parser.add_argument(
+        "--timings-file",
+        type=str,
+        help='path of JSON file in which to save wall time, cpu time and peak memory of each processing stage and input file',
+        default=None,
+        dest="timings_file",
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        help='maximum memory in MB of each process - processing stops once a process exceeds this after releasing an input file, and outputs are written for the files processed before',
+        default=None,
+        dest="memory_budget",
+    )
+
     parsed_args = parser.parse_args()
     critical_durations = None
 
+    if parsed_args.spatial_join_tolerance is not None and not parsed_args.spatial_join_tolerance > 0:
+        parser.error(f"argument --spatial-join: must be greater than 0: {parsed_args.spatial_join_tolerance}")
+
     try:
+        parsed_args.statistics = [
+            statistic for statistic in validate_statistics(parsed_args.statistics) if statistic not in DEFAULT_STATISTICS
+        ]
+        parsed_args.start, parsed_args.end = [
+            None if time is None else datetime.fromisoformat(time).isoformat() for time in [parsed_args.start, parsed_args.end]
+        ]
+        if parsed_args.stride < 1:
+            raise ValueError(f"Stride must be at least 1: {parsed_args.stride}")
+        if parsed_args.subset_ids is not None:
+            parsed_args.subset_ids = read_id_list(parsed_args.subset_ids)
+            log.info(f"Extracting a subset of {len(parsed_args.subset_ids)} ids")
+        if parsed_args.subset_regex is not None:
+            re.compile(parsed_args.subset_regex)
+        if parsed_args.subset_bbox is not None:
+            xmin, ymin, xmax, ymax = parsed_args.subset_bbox
+            if xmin > xmax or ymin > ymax:
+                raise ValueError(f"Bounding box must be XMIN YMIN XMAX YMAX: {parsed_args.subset_bbox}")
         if parsed_args.path_to_file_list is not None:
             file_paths, critical_durations = get_file_list(parsed_args.path_to_file_list)
         else:
@@ -182,11 +449,12 @@ def parse_arguments() -> Tuple[
             from_crs,
             parsed_args.no_round_outputs,
             parsed_args.include_timings,
+            parsed_args,
         )
 
     except Exception as e:
         log.critical(f"Input arguments are not valid. Error: {e}")
-        return None, None, None, None, None, None, None
+        return None, None, None, None, None, None, None, None
 
 
 def get_input_paths(
@@ -206,53 +474,576 @@ def get_input_paths(
     )
 
 
-def get_all_node_data(
+def extract_file_data(
+    file_path: str,
+    chainage_tolerance: float = CHAINAGE_TOLERANCE,
+    statistics: List[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    stride: int = 1,
+    subset_ids: Optional[List[str]] = None,
+    subset_regex: Optional[str] = None,
+    subset_bbox: Optional[List[float]] = None,
+    memory_budget_mb: Optional[float] = None,
+) -> Optional[Dict[str, any]]:
+    """
+    loads a single file and extracts its data - defined at module level so that it can be run in a worker process.
+    The loaded result data is released before returning.
+    :param file_path: path to file to process - assumed to be loadable using mikio1d
+    :param chainage_tolerance: maximum distance down a reach between a grid point and its matched water level point
+    :param statistics: water level statistics in addition to maximum water level and its timing
+    :param start: first time from which statistics are computed - None from the start of the file
+    :param end: last time to which statistics are computed - None to the end of the file
+    :param stride: interval between time steps from which statistics are computed
+    :param subset_ids: node, grid point or reach ids to extract - only data items of these are loaded
+    :param subset_regex: regular expression searched for in the ids to extract - only time series of reaches with
+        matching grid points are read
+    :param subset_bbox: xmin, ymin, xmax, ymax of the nodes and grid points to extract - only time series of reaches
+        with grid points in the box are read
+    :param memory_budget_mb: raise MemoryBudgetExceeded if the process exceeds this once the file is released
+    :return: projection, data of each node, stage timings and, where time steps are selected, the effective time window
+        of the file - None if the file is not of a supported type
+    """
+    include_nodes, include_reaches = True, True
+    log.debug(f"Loading file: {file_path}")
+    file_extension = get_file_type(file_path)
+    instrumentation = Instrumentation()
+    subset_node_ids, subset_reach_ids = get_loader_ids(subset_ids) if subset_ids is not None else (None, None)
+
+    if file_extension == "res11":
+        result_file = ResultFile(
+            file_path,
+            partial(
+                load_res_file,
+                reach_ids=subset_reach_ids,
+                read_lazily=subset_regex is not None or subset_bbox is not None,  # read once the subset is known
+            ),
+        )
+        include_nodes = False
+    elif file_extension == "prf":
+        result_file = ResultFile(file_path, partial(load_prf_file, node_ids=subset_node_ids))
+        include_reaches = False
+    else:
+        return None
+
+    with instrumentation.stage("load", split(file_path)[-1]):
+        result_file.open()
+    try:
+        times, time_steps, time_window = None, None, None
+        if start is not None or end is not None or stride != 1:
+            with instrumentation.stage("time_window", split(file_path)[-1]):
+                times = get_result_times(result_file.data)
+                time_steps = get_time_step_index(len(times), times, start=start, end=end, stride=stride)
+                time_window = get_effective_window(time_steps, times, stride=stride)
+        with instrumentation.stage("get_data", split(file_path)[-1]):
+            all_data_from_file, projection = get_data(
+                result_file.data,
+                df=result_file.df,
+                include_nodes=include_nodes,
+                include_reaches=include_reaches,
+                chainage_tolerance=chainage_tolerance,
+                statistics=statistics,
+                time_steps=time_steps,
+                subset_ids=subset_ids,
+                subset_regex=subset_regex,
+                subset_bbox=subset_bbox,
+                times=times,
+            )
+    finally:
+        with instrumentation.stage("release", split(file_path)[-1]):
+            result_file.close()
+    check_memory_budget(memory_budget_mb, f"processing {split(file_path)[-1]}")
+    file_data = {
+        "projection": projection,
+        "nodes": all_data_from_file,
+        "timings": instrumentation.records,
+    }
+    if time_window is not None:
+        file_data["time_window"] = time_window
+    return file_data
+
+
+def extract_staged_file_data(
+    file_path: str,
+    stager: FileStager,
+    instrumentation: Instrumentation,
+    **extraction_options,
+) -> Optional[Dict[str, any]]:
+    """
+    loads a single file from its staged copy and extracts its data - the copy is removed once extracted
+    :param file_path: path to file to process - must be the next file scheduled with the stager
+    :param stager: stager to which the file has been scheduled
+    :param instrumentation: record of stage timings - time waiting on the copy is recorded as stage_wait
+    :param extraction_options: keyword arguments of extract_file_data
+    :return: as extract_file_data
+    """
+    with instrumentation.stage("stage_wait", split(file_path)[-1]):
+        local_file_path = stager.get(file_path)
+    try:
+        return extract_file_data(local_file_path, **extraction_options)
+    finally:
+        stager.release(local_file_path)
+
+
+def get_file_type(file_path: str) -> str:
+    _, file_name = split(file_path)
+    return file_name.split(".")[1].lower()
+
+
+def get_file_data(
     file_paths: List[str],
-):
+    jobs: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    stager: Optional[FileStager] = None,
+    extraction_options: Optional[Dict[str, any]] = None,
+    memory_budget_mb: Optional[float] = None,
+) -> Iterator[Tuple[str, Optional[Dict[str, any]]]]:
     """
-    gets specified node data from all files
+    yields data extracted from each file in input order as it becomes available - cached data is read as it is reached
     :param file_paths: list of paths to files to include in processing - each of these files are assumed to be loadable using mikio1d
-    :param critical_durations: list of critical durations to include in processing - ordered list expected in the same order as files
-    :return: node data
+    :param jobs: number of worker processes - each worker loads its own .NET runtime - output order matches the sequential run
+    :param cache: optional cache of extracted data - files with a valid entry are not loaded
+    :param instrumentation: optional record of stage timings - timings of worker processes are merged into this
+    :param stager: optional stager copying files to local scratch ahead of loading - used with a single process only
+    :param extraction_options: keyword arguments of extract_file_data - also part of cache keys
+    :param memory_budget_mb: raise MemoryBudgetExceeded if a process exceeds this once a file is released
+    :return: file path and projection and data of each node of the file - None if the file is not of a supported type
     """
-    all_node_data = []
-    for file_path in file_paths:
-        include_nodes, include_reaches = True, True
-        if file_path:
-            log.debug(f"Loading file: {file_path}")
-            _, file_name = split(file_path)
-            split_row = file_name.split(".")
-            file_extension = split_row[1].lower()
-
-            data, df = None, None
-            if file_extension == "res11":
-                data, df = load_res_file(file_path)
-                include_nodes = False
-            elif file_extension == "prf":
-                data, df = load_prf_file(file_path)
-                include_reaches = False
-
-            if data is not None:
-                all_data_from_file, projection = get_data(
-                    data,
-                    df=df,
-                    include_nodes=include_nodes,
-                    include_reaches=include_reaches,
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    if extraction_options is None:
+        extraction_options = {}
+    extract = partial(extract_file_data, memory_budget_mb=memory_budget_mb, **extraction_options)  # picklable for worker processes
+    file_paths = [file_path for file_path in file_paths if file_path]
+    cached_file_paths = set()
+    if cache is not None:
+        with instrumentation.stage("cache_lookup"):
+            cached_file_paths = {
+                file_path for file_path in file_paths if cache.contains(file_path, extraction_options)
+            }
+    uncached_file_paths = [file_path for file_path in file_paths if file_path not in cached_file_paths]
+
+    jobs = max(1, min(jobs, len(uncached_file_paths)))
+    if jobs > 1:
+        log.info(f"Processing {len(uncached_file_paths)} files with {jobs} worker processes")
+
+    with ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else nullcontext() as executor:
+        # both map implementations yield extracted data in input order as it becomes available
+        if executor is None and stager is not None:
+            stager.schedule(uncached_file_paths)
+            extracted_data = (
+                extract_staged_file_data(
+                    file_path, stager, instrumentation, memory_budget_mb=memory_budget_mb, **extraction_options
                 )
+                for file_path in uncached_file_paths
+            )
+        else:
+            if stager is not None:
+                log.info("Input files are not staged when processing with worker processes")
+            extracted_data = (
+                map_ahead(executor, extract, uncached_file_paths, ahead=2 * jobs)
+                if executor is not None
+                else map(extract, uncached_file_paths)
+            )
+        try:
+            for file_path in file_paths:
+                file_data = None
+                if file_path in cached_file_paths:
+                    file_data = cache.get(file_path, extraction_options)
+                    if file_data is None:  # evicted since lookup
+                        file_data = extract(file_path)
+                else:
+                    file_data = next(extracted_data)
+                if file_data is not None and "timings" in file_data:  # newly extracted
+                    instrumentation.extend(file_data.pop("timings"))
+                    if cache is not None:
+                        cache.put(file_path, file_data, extraction_options)
+                yield file_path, file_data
+        finally:
+            close = getattr(extracted_data, "close", None)
+            if close is not None:
+                close()  # cancels files not yet started by worker processes
+
+
+def map_ahead(
+    executor: Executor,
+    function: Callable,
+    items: Iterable,
+    ahead: int,
+) -> Iterator:
+    """
+    maps function over items in an executor, yielding results in input order - unlike Executor.map only this many items
+    are submitted ahead of the result being yielded, bounding results held in memory, and items not yet started are
+    cancelled if the consumer stops i.e. on an error
+    :param executor: executor
+    :param function: function of a single item
+    :param items: items
+    :param ahead: maximum number of items submitted and not yet yielded
+    :return: results in input order
+    """
+    items = iter(items)
+    futures = deque(executor.submit(function, item) for item in islice(items, max(1, ahead)))
+    try:
+        while futures:
+            result = futures.popleft().result()
+            futures.extend(executor.submit(function, item) for item in islice(items, 1))
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
 
-                for node_id, values in all_data_from_file.items():
-                    node_payload = {
-                        "file": file_name,
-                        "file_type": file_extension,
-                        "projection": projection,
-                        "node_id": node_id,
-                    }
-                    node_payload.update(values.items())
-                    all_node_data.append(node_payload)
+
+def get_all_node_data(
+    file_paths: List[str],
+    jobs: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    all_node_data: Optional[NodeResults] = None,
+    stager: Optional[FileStager] = None,
+    extraction_options: Optional[Dict[str, any]] = None,
+    memory_budget_mb: Optional[float] = None,
+    time_windows: Optional[Dict[str, Dict[str, any]]] = None,
+) -> NodeResults:
+    """
+    gets specified node data from all files
+    :param file_paths: list of paths to files to include in processing - each of these files are assumed to be loadable using mikio1d
+    :param jobs: number of worker processes - each worker loads its own .NET runtime - output order matches the sequential run
+    :param cache: optional cache of extracted data - files with a valid entry are not loaded
+    :param instrumentation: optional record of stage timings - timings of worker processes are merged into this
+    :param all_node_data: optional node data of previously processed files to which data of these files is appended
+    :param stager: optional stager copying files to local scratch ahead of loading
+    :param extraction_options: keyword arguments of extract_file_data
+    :param memory_budget_mb: raise MemoryBudgetExceeded if a process exceeds this once a file is collated - the data of
+        files collated before is kept in all_node_data
+    :param time_windows: optional dictionary to which the effective time window of each file is added by file name
+    :return: node data of all files
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    if all_node_data is None:
+        all_node_data = NodeResults()
+    file_data_iterator = get_file_data(
+        file_paths,
+        jobs=jobs,
+        cache=cache,
+        instrumentation=instrumentation,
+        stager=stager,
+        extraction_options=extraction_options,
+        memory_budget_mb=memory_budget_mb,
+    )
+    try:
+        for file_path, file_data in file_data_iterator:
+            if file_data is not None:
+                with instrumentation.stage("collate", split(file_path)[-1]):
+                    all_node_data.append_file(
+                        file_name=split(file_path)[-1],
+                        file_type=get_file_type(file_path),
+                        projection=file_data["projection"],
+                        nodes=file_data["nodes"],
+                    )
+                if time_windows is not None and "time_window" in file_data:
+                    time_windows[split(file_path)[-1]] = file_data["time_window"]
+            check_memory_budget(memory_budget_mb, f"collating {split(file_path)[-1]}")
+    finally:
+        file_data_iterator.close()
 
     return all_node_data
 
 
+def stream_node_data(
+    file_paths: List[str],
+    output_file_path: str,
+    round_decimals: bool = False,
+    jobs: int = 1,
+    cache: Optional[ExtractionCache] = None,
+    instrumentation: Optional[Instrumentation] = None,
+    stager: Optional[FileStager] = None,
+    extraction_options: Optional[Dict[str, any]] = None,
+    memory_budget_mb: Optional[float] = None,
+    time_windows: Optional[Dict[str, Dict[str, any]]] = None,
+) -> int:
+    """
+    writes node data of each file to the unformatted csv as soon as the file is processed - data is not retained
+    :param file_paths: list of paths to files to include in processing - each of these files are assumed to be loadable using mikio1d
+    :param output_file_path: path of unformatted csv
+    :param round_decimals: round decimal outputs to three decimal places
+    :param jobs: number of worker processes
+    :param cache: optional cache of extracted data - files with a valid entry are not loaded
+    :param instrumentation: optional record of stage timings - timings of worker processes are merged into this
+    :param stager: optional stager copying files to local scratch ahead of loading
+    :param extraction_options: keyword arguments of extract_file_data
+    :param memory_budget_mb: raise MemoryBudgetExceeded if a process exceeds this once a file is released - rows of
+        files written before are kept in the output
+    :param time_windows: optional dictionary to which the effective time window of each file is added by file name
+    :return: number of rows written
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    with StreamingCsvWriter(
+        output_file_path,
+        round_decimals=round_decimals,
+        statistics=(extraction_options or {}).get("statistics"),
+    ) as writer:
+        file_data_iterator = get_file_data(
+            file_paths,
+            jobs=jobs,
+            cache=cache,
+            instrumentation=instrumentation,
+            stager=stager,
+            extraction_options=extraction_options,
+            memory_budget_mb=memory_budget_mb,
+        )
+        for file_path, file_data in file_data_iterator:
+            if file_data is not None:
+                with instrumentation.stage("write_stream_csv", split(file_path)[-1]):
+                    writer.write_file(
+                        file_name=split(file_path)[-1],
+                        file_type=get_file_type(file_path),
+                        projection=file_data["projection"],
+                        nodes=file_data["nodes"],
+                    )
+                if time_windows is not None and "time_window" in file_data:
+                    time_windows[split(file_path)[-1]] = file_data["time_window"]
+                log.info(f"Streamed {len(file_data['nodes'])} rows of file: {file_path}")
+        return writer.row_count
+
+
+def get_previous_node_data(
+    output_directory: str,
+    output_filename: str,
+    file_paths: List[str],
+    critical_durations: Optional[List[Optional[str]]],
+    include_timings: bool = False,
+    statistics: List[str] = None,
+) -> Tuple[NodeResults, List[str], List[Optional[str]], List[str]]:
+    """
+    reads the outputs of a previous run so that only files not already summarised need to be loaded
+    :param output_directory: directory of previous outputs
+    :param output_filename: filename of previous outputs
+    :param file_paths: list of paths to files to include in processing
+    :param critical_durations: critical duration of each file - these take precedence over those of the previous run
+    :param include_timings: also read the timing output of the previous run
+    :param statistics: also read the output of the previous run of each of these statistics
+    :return: node data of previous files, all file paths, critical duration of each file and paths of files to load
+    """
+    if critical_durations is None:
+        critical_durations = [None for _ in range(len(file_paths))]
+    all_node_data = NodeResults()
+    csv_file_path = join(output_directory, f"{output_filename}.csv")
+    log_file_path = join(output_directory, f"{output_filename}.log")
+    timing_file_path = join(output_directory, f"{output_filename}_timing.csv")
+    if not isfile(csv_file_path):
+        log.warning(f"No previous output to update: {csv_file_path} - processing all files")
+        return all_node_data, file_paths, critical_durations, file_paths
+
+    previous_file_paths, previous_critical_durations = [], []
+    if isfile(log_file_path):
+        previous_file_paths, previous_critical_durations = read_log(log_file_path)
+    else:
+        log.warning(f"No previous log: {log_file_path} - file order and critical durations are taken from {csv_file_path}")
+
+    file_data = read_formatted_csv(csv_file_path)
+    if include_timings:
+        if isfile(timing_file_path):
+            file_data = read_formatted_csv(timing_file_path, "max_water_level_timing", file_data)
+        else:
+            log.warning(f"No previous timing output: {timing_file_path} - timings of previous files are not available")
+    for statistic in statistics or []:
+        statistic_file_path = join(output_directory, f"{output_filename}_{statistic}.csv")
+        if isfile(statistic_file_path):
+            file_data = read_formatted_csv(statistic_file_path, get_output_column(statistic), file_data)
+        else:
+            log.warning(f"No previous {statistic} output: {statistic_file_path} - {statistic} of previous files is not available")
+
+    # previous files are those of the previous log followed by any found only in the summary
+
+    previous_durations = dict(zip(previous_file_paths, previous_critical_durations))
+    logged_file_names = {split(file_path)[-1] for file_path in previous_file_paths}
+    previous_paths = list(previous_file_paths) + [file_name for file_name in file_data if file_name not in logged_file_names]
+    previous_file_names = {split(file_path)[-1] for file_path in previous_paths}
+
+    listed_durations = {
+        split(file_path)[-1]: duration
+        for file_path, duration in zip(file_paths, critical_durations)
+        if file_path and duration is not None
+    }
+    previous_critical_durations = [
+        listed_durations.get(split(file_path)[-1], previous_durations.get(file_path))
+        for file_path in previous_paths
+    ]
+
+    for file_name, nodes in file_data.items():
+        all_node_data.append_file(file_name=file_name, file_type=get_file_type(file_name), projection="", nodes=nodes)
+
+    new_file_paths = [file_path for file_path in file_paths if file_path and split(file_path)[-1] not in previous_file_names]
+    new_critical_durations = [
+        duration for file_path, duration in zip(file_paths, critical_durations)
+        if file_path and split(file_path)[-1] not in previous_file_names
+    ]
+    log.info(f"Updating {len(previous_paths)} previously processed files with {len(new_file_paths)} new files")
+
+    return (
+        all_node_data,
+        previous_paths + new_file_paths,
+        previous_critical_durations + new_critical_durations,
+        new_file_paths,
+    )
+
+
+def write_outputs(
+    all_node_data: NodeResults,
+    file_paths: List[str],
+    critical_duration_dict: Dict[str, Optional[str]],
+    output_directory: str,
+    output_filename: str,
+    from_crs: Optional[str],
+    no_round_outputs: bool,
+    include_timings: bool,
+    instrumentation: Instrumentation,
+    spatial_join_tolerance: Optional[float] = None,
+    statistics: List[str] = None,
+    ensemble_statistic: Optional[str] = None,
+    filename_regex: str = FILENAME_REGEX,
+) -> List[str]:
+    """
+    writes formatted csv, timing csv, statistic csv, ensemble csv and geojson outputs
+    :param spatial_join_tolerance: distance within which nodes of different files are merged - None does not merge
+    :param statistics: water level statistics each written to a formatted csv of their own i.e. ["p95"]
+    :param ensemble_statistic: reduction over temporal patterns of the ensemble output - None does not write it
+    :param filename_regex: regular expression by which AEP, duration and temporal pattern are read from file names
+    :return: paths of output files including the log
+    """
+
+    if spatial_join_tolerance is not None:
+        with instrumentation.stage("spatial_join"):
+            spatial_join(all_node_data, spatial_join_tolerance)
+
+    # construct_csv(  # uncomment this to produce an un-formatted output
+    #     data=all_node_data,
+    #     output_file_path_no_extension=join(abspath(output_directory), "node_data"),
+    #     round_decimals=not no_round_outputs,
+    # )
+
+    with instrumentation.stage("pivot"):
+        all_node_data.get_row_index()  # held by all_node_data for each formatted output
+
+    with instrumentation.stage("write_csv"):
+        construct_formatted_csv(
+            data=all_node_data,
+            output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}.csv"),
+            critical_durations=critical_duration_dict,
+            ordered_data_files=[split(e)[-1] for e in file_paths],
+            round_decimals=not no_round_outputs,
+            timings=False,
+        )
+
+    output_files = [
+        abspath(join(output_directory, f"{output_filename}.csv")),
+        abspath(f"{output_filename}.log"),
+    ]
+    if include_timings:
+        with instrumentation.stage("write_timing_csv"):
+            construct_formatted_csv(
+                data=all_node_data,
+                output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}_timing.csv"),
+                critical_durations=critical_duration_dict,
+                ordered_data_files=[split(e)[-1] for e in file_paths],
+                round_decimals=not no_round_outputs,
+                timings=True,
+            )
+
+        output_files = [
+            abspath(join(output_directory, f"{output_filename}.csv")),
+            abspath(join(output_directory, f"{output_filename}_timing.csv")),
+            abspath(join(output_directory, f"{output_filename}.log")),
+        ]
+
+    for statistic in statistics or []:
+        with instrumentation.stage(f"write_{statistic}_csv"):
+            construct_formatted_csv(
+                data=all_node_data,
+                output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}_{statistic}.csv"),
+                critical_durations=critical_duration_dict,
+                ordered_data_files=[split(e)[-1] for e in file_paths],
+                round_decimals=not no_round_outputs,
+                value_column=get_output_column(statistic),
+            )
+        output_files.insert(-1, abspath(join(output_directory, f"{output_filename}_{statistic}.csv")))
+
+    if ensemble_statistic is not None:
+        with instrumentation.stage("write_ensemble_csv"):
+            construct_ensemble_csv(
+                data=all_node_data,
+                output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}_ensemble.csv"),
+                ordered_data_files=[split(e)[-1] for e in file_paths],
+                statistic=ensemble_statistic,
+                filename_regex=filename_regex,
+                round_decimals=not no_round_outputs,
+            )
+        output_files.insert(-1, abspath(join(output_directory, f"{output_filename}_ensemble.csv")))
+
+    if from_crs is not None:
+        with instrumentation.stage("write_geojson"):
+            all_node_geojson = construct_geojson(
+                from_crs=f"epsg:{from_crs}",
+                nodes=all_node_data,
+            )
+
+            with open(join(output_directory, f"{output_filename}.geojson"), "w") as geo_file:
+                dump(all_node_geojson, geo_file)
+        output_files.append(join(output_directory, abspath(f"{output_filename}.geojson")))
+
+    if spatial_join_tolerance is not None:
+        construct_merged_nodes_csv(
+            merged_node_ids=all_node_data.get_merged_node_ids(),
+            output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}_spatial_join.csv"),
+        )
+        output_files.append(abspath(join(output_directory, f"{output_filename}_spatial_join.csv")))
+
+    return output_files
+
+
+def write_log(
+    log_payload: Dict[str, any],
+    output_files: List[str],
+    output_directory: str,
+    output_filename: str,
+    instrumentation: Instrumentation,
+    timings_file_path: Optional[str] = None,
+) -> None:
+    """
+    writes the log of the run and optional timings file
+    """
+    if timings_file_path is not None:
+        output_files = output_files + [abspath(timings_file_path)]
+
+    log_payload["output_files"] = output_files
+    log_payload["timings"] = instrumentation.to_dict()
+
+    if timings_file_path is not None:
+        with open(timings_file_path, "w") as timings_file:
+            dump(log_payload["timings"], timings_file, indent=4)
+
+    with open(join(output_directory, f"{output_filename}.log"), "w") as log_file:
+        dump(log_payload, log_file, indent=4)
+
+    construct_log(
+        full_file_path=join(output_directory, f"{output_filename}.log"),
+        description=log_payload["description"],
+        license=log_payload["license"],
+        user=log_payload["user"],
+        machine_id=log_payload["machine_id"],
+        utc_timestamp=log_payload["utc_timestamp"],
+        input_command=log_payload["command"],
+        input_files=log_payload["input_files"],
+        critical_durations=log_payload["critical_durations"],
+        output_files=log_payload["output_files"],
+        timings=log_payload["timings"],
+        time_windows=log_payload.get("time_windows"),
+    )
+
+
 def main(argv):
 
     # configuration parameters
@@ -278,11 +1069,29 @@ If the CSV output file is converted to spreadsheet format then this log file sho
         from_crs,
         no_round_outputs,
         include_timings,
+        options,
      ) = parse_arguments()
 
     if output_filename is None:
         output_filename = "formatted_node_data"
 
+    instrumentation = Instrumentation()
+    all_node_data = NodeResults()
+    new_file_paths = file_paths
+    if file_paths is not None and options.update:
+        if options.stream:
+            log.warning("Existing outputs are not updated when streaming - processing all files")
+        else:
+            with instrumentation.stage("read_previous_outputs"):
+                all_node_data, file_paths, critical_durations, new_file_paths = get_previous_node_data(
+                    output_directory,
+                    output_filename,
+                    file_paths,
+                    critical_durations,
+                    include_timings=include_timings,
+                    statistics=options.statistics,
+                )
+
     log_payload = {
         "description": description,
         "license": "TBC",
@@ -303,6 +1112,9 @@ If the CSV output file is converted to spreadsheet format then this log file sho
 
     if critical_durations is None:
         critical_durations = [None for _ in range(len(file_paths))]
+    if options.ensemble_statistic is not None:  # durations parsed from file names only group files of an ensemble
+        critical_durations = fill_critical_durations(file_paths, critical_durations, options.filename_regex)
+    log_payload["critical_durations"] = critical_durations
 
     critical_duration_dict = {}
     for file, duration in zip(file_paths, critical_durations):
@@ -311,73 +1123,178 @@ If the CSV output file is converted to spreadsheet format then this log file sho
 
     # get all data
 
-    all_node_data = get_all_node_data(file_paths)
-
-    # construct output files
-
-    # construct_csv(  # uncomment this to produce an un-formatted output
-    #     data=all_node_data,
-    #     output_file_path_no_extension=join(abspath(output_directory), "node_data"),
-    #     round_decimals=not no_round_outputs,
-    # )
-
-    construct_formatted_csv(
-        data=all_node_data,
-        output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}.csv"),
-        critical_durations=critical_duration_dict,
-        ordered_data_files=[split(e)[-1] for e in file_paths],
-        round_decimals=not no_round_outputs,
-        timings=False,
-    )
+    cache = None
+    if not options.no_cache:
+        cache = ExtractionCache(
+            cache_directory=options.cache_directory,
+            max_size_bytes=options.cache_size * 1024 * 1024,
+            use_content_hash=options.cache_content_hash,
+            refresh=options.refresh_cache,
+        )
 
-    output_files = [
-        abspath(join(output_directory, f"{output_filename}.csv")),
-        abspath(f"{output_filename}.log"),
-    ]
-    if include_timings:
-        construct_formatted_csv(
-            data=all_node_data,
-            output_file_path_no_extension=join(abspath(output_directory), f"{output_filename}_timing.csv"),
-            critical_durations=critical_duration_dict,
-            ordered_data_files=[split(e)[-1] for e in file_paths],
-            round_decimals=not no_round_outputs,
-            timings=True,
+    extraction_options = {
+        "chainage_tolerance": options.chainage_tolerance,
+        "statistics": options.statistics,
+        "start": options.start,
+        "end": options.end,
+        "stride": options.stride,
+        "subset_ids": options.subset_ids,
+        "subset_regex": options.subset_regex,
+        "subset_bbox": options.subset_bbox,
+    }
+    time_windows = None
+    if options.start is not None or options.end is not None or options.stride != 1:
+        time_windows = {}  # effective window of each file by file name - filled as files are processed
+        log_payload["time_window"] = {"start": options.start, "end": options.end, "stride": options.stride}
+        log_payload["time_windows"] = time_windows
+
+    stager = None
+    if options.stage_directory is not None:
+        stager = FileStager(
+            scratch_directory=options.stage_directory,
+            prefetch_count=options.stage_ahead,
+            max_bytes=options.stage_size * 1024 * 1024,
         )
 
+    if options.stream:
+        if include_timings or from_crs is not None:
+            log.warning("Timing and geojson outputs are not produced when streaming")
+        stream_file_path = abspath(join(output_directory, f"{output_filename}_node_data.csv"))
+        try:
+            with instrumentation.stage("extract"):
+                row_count = stream_node_data(
+                    file_paths,
+                    stream_file_path,
+                    round_decimals=not no_round_outputs,
+                    jobs=options.jobs,
+                    cache=cache,
+                    instrumentation=instrumentation,
+                    stager=stager,
+                    extraction_options=extraction_options,
+                    memory_budget_mb=options.memory_budget,
+                    time_windows=time_windows,
+                )
+            log.info(f"Streamed {row_count} rows to: {stream_file_path}")
+        except MemoryBudgetExceeded as e:
+            log.critical(f"{e} - {stream_file_path} holds the files processed before")
         output_files = [
-            abspath(join(output_directory, f"{output_filename}.csv")),
-            abspath(join(output_directory, f"{output_filename}_timing.csv")),
+            stream_file_path,
             abspath(join(output_directory, f"{output_filename}.log")),
         ]
-
-    if from_crs is not None:
-        all_node_geojson = construct_geojson(
-            from_crs=f"epsg:{from_crs}",
-            nodes=all_node_data,
+    elif options.watch:
+        if options.input_directory is None:
+            log.critical("An input directory is required to watch for input files")
+            return
+        watcher = FileWatcher(
+            get_file_paths=lambda: get_input_paths(abspath(options.input_directory), options.subdir),
+            stable_seconds=options.stable_time,
+            poll_interval=options.poll_interval,
+            known_file_paths=[file_path for file_path in file_paths if file_path not in new_file_paths],
+        )
+        file_paths = [file_path for file_path in file_paths if file_path not in new_file_paths]
+        output_files = []
+        try:
+            for ready_file_paths in watcher.watch(idle_timeout=options.idle_timeout):
+                with instrumentation.stage("extract"):
+                    get_all_node_data(
+                        ready_file_paths,
+                        jobs=options.jobs,
+                        cache=cache,
+                        instrumentation=instrumentation,
+                        all_node_data=all_node_data,
+                        stager=stager,
+                        extraction_options=extraction_options,
+                        memory_budget_mb=options.memory_budget,
+                        time_windows=time_windows,
+                    )
+                file_paths += ready_file_paths
+                ready_critical_durations = [None] * len(ready_file_paths)
+                if options.ensemble_statistic is not None:
+                    ready_critical_durations = fill_critical_durations(
+                        ready_file_paths,
+                        ready_critical_durations,
+                        options.filename_regex,
+                    )
+                critical_duration_dict.update(
+                    (split(file_path)[-1], critical_duration)
+                    for file_path, critical_duration in zip(ready_file_paths, ready_critical_durations)
+                )
+                output_files = write_outputs(
+                    all_node_data,
+                    file_paths,
+                    critical_duration_dict,
+                    output_directory,
+                    output_filename,
+                    from_crs,
+                    no_round_outputs,
+                    include_timings,
+                    instrumentation,
+                    spatial_join_tolerance=options.spatial_join_tolerance,
+                    statistics=options.statistics,
+                    ensemble_statistic=options.ensemble_statistic,
+                    filename_regex=options.filename_regex,
+                )
+                log_payload["input_files"] = file_paths
+                log_payload["critical_durations"] = [critical_duration_dict[split(e)[-1]] for e in file_paths]
+                write_log(log_payload, output_files, output_directory, output_filename, instrumentation, options.timings_file)
+                log.info(f"Outputs updated with {len(file_paths)} input files")
+        except KeyboardInterrupt:
+            log.info("Watch interrupted")
+        except MemoryBudgetExceeded as e:
+            log.critical(f"{e} - watch stopped, outputs hold the files processed before")
+        log_payload["input_files"] = file_paths
+        log_payload["critical_durations"] = [critical_duration_dict[split(e)[-1]] for e in file_paths]
+    else:
+        try:
+            with instrumentation.stage("extract"):
+                all_node_data = get_all_node_data(
+                    new_file_paths,
+                    jobs=options.jobs,
+                    cache=cache,
+                    instrumentation=instrumentation,
+                    all_node_data=all_node_data,
+                    stager=stager,
+                    extraction_options=extraction_options,
+                    memory_budget_mb=options.memory_budget,
+                    time_windows=time_windows,
+                )
+        except MemoryBudgetExceeded as e:
+            processed_file_names = set(all_node_data.files)
+            unprocessed_file_paths = [
+                file_path for file_path in new_file_paths
+                if file_path and split(file_path)[-1] not in processed_file_names
+            ]
+            log.critical(f"{e} - outputs are written without the {len(unprocessed_file_paths)} files not yet processed")
+
+        output_files = write_outputs(
+            all_node_data,
+            file_paths,
+            critical_duration_dict,
+            output_directory,
+            output_filename,
+            from_crs,
+            no_round_outputs,
+            include_timings,
+            instrumentation,
+            spatial_join_tolerance=options.spatial_join_tolerance,
+            statistics=options.statistics,
+            ensemble_statistic=options.ensemble_statistic,
+            filename_regex=options.filename_regex,
         )
 
-        with open(join(output_directory, f"{output_filename}.geojson"), "w") as geo_file:
-            dump(all_node_geojson, geo_file)
-        output_files.append(join(output_directory, abspath(f"{output_filename}.geojson")))
-
-    log_payload["output_files"] = output_files
+    if cache is not None:
+        cache.close()
+    if stager is not None:
+        stager.close()
 
-    with open(join(output_directory, f"{output_filename}.log"), "w") as log_file:
-        dump(log_payload, log_file, indent=4)
+    peak_rss_mb = get_peak_rss_mb()
+    if peak_rss_mb is not None:
+        budget = "" if options.memory_budget is None else f" of budget {options.memory_budget:.0f} MB"
+        log.info(f"Peak memory of main process: {peak_rss_mb:.0f} MB{budget}")
 
-    construct_log(
-        full_file_path=join(output_directory, f"{output_filename}.log"),
-        description=log_payload["description"],
-        license=log_payload["license"],
-        user=log_payload["user"],
-        machine_id=log_payload["machine_id"],
-        utc_timestamp=log_payload["utc_timestamp"],
-        input_command=log_payload["command"],
-        input_files=log_payload["input_files"],
-        critical_durations=log_payload["critical_durations"],
-        output_files=log_payload["output_files"],
-    )
+    write_log(log_payload, output_files, output_directory, output_filename, instrumentation, options.timings_file)
 
 
 if __name__ == "__main__":
+    freeze_support()  # required for worker processes when frozen with pyinstaller
     main(argv)
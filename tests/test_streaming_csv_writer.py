@@ -0,0 +1,60 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+import csv
+
+from dpc.output.create_output_files import StreamingCsvWriter, CSV_COLUMNS
+
+
+def read_rows(file_path):
+    with open(file_path, "r", newline="") as csv_file:
+        return list(csv.reader(csv_file))
+
+
+def test_header_kept_where_first_file_is_empty(tmp_path):
+    output_file_path = str(tmp_path / "stream.csv")
+    with StreamingCsvWriter(output_file_path, statistics=["p95", "time_above_0.5"]) as writer:
+        writer.write_file("run_1.res11", "res11", "projection", {})
+        writer.write_file(
+            "run_2.res11",
+            "res11",
+            "projection",
+            {
+                "SUMN.SUMNSTM 281.5": {
+                    "x": 1.0,
+                    "y": 2.0,
+                    "invert_level": 3.0,
+                    "max_water_level": 4.5,
+                    "max_water_level_timing": 7,
+                    "p95_water_level": 4.25,
+                    "time_above_0.5": 1.5,
+                }
+            },
+        )
+    rows = read_rows(output_file_path)
+    assert rows[0] == CSV_COLUMNS + [
+        "max_water_level",
+        "max_water_level_timing",
+        "p95_water_level",
+        "time_above_0.5",
+    ]
+    assert rows[1] == [
+        "run_2.res11", "SUMN.SUMNSTM 281.5", "res11", "projection", "1.0", "2.0", "3.0", "4.5", "7", "4.25", "1.5"
+    ]
+    assert writer.row_count == 1
+
+
+def test_header_written_without_files(tmp_path):
+    output_file_path = str(tmp_path / "stream.csv")
+    with StreamingCsvWriter(output_file_path):
+        pass
+    assert read_rows(output_file_path) == [CSV_COLUMNS + ["max_water_level", "max_water_level_timing"]]
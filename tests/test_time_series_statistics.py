@@ -0,0 +1,54 @@
+#!
+# -*- coding: utf-8 -*-
+"""
+╔═╗╦ ╦╔╦╗  ╔╦╗┬┌─┐┬┌┬┐┌─┐┬
+║ ╦╠═╣ ║║   ║║││ ┬│ │ ├─┤│
+╚═╝╩ ╩═╩╝  ═╩╝┴└─┘┴ ┴ ┴ ┴┴─┘
+
+Created on 2026-10-17
+@author: Edmund Bennett
+@email: edmund.bennett@ghd.com
+"""
+
+import numpy as np
+
+from dpc.analysis.time_series_statistics import get_time_step_durations, reduce_time_series
+
+
+def get_times(minutes):
+    return np.datetime64("2021-01-01T00:00:00", "ns") + np.asarray(minutes).astype("timedelta64[m]")
+
+
+def get_span_hours(times):
+    return (times[-1] - times[0]).astype("timedelta64[ns]").astype(np.int64) / 3.6e12
+
+
+def test_durations_sum_to_window_span():
+    times = get_times([0, 10, 20, 45, 60, 90])
+    durations = get_time_step_durations(times)
+    assert np.isclose(durations.sum(), get_span_hours(times))
+    assert np.allclose(durations, np.array([5, 10, 17.5, 20, 22.5, 15]) / 60)
+
+
+def test_strided_durations_sum_to_window_span():
+    times = get_times(np.arange(0, 6 * 60 + 1, 5))
+    strided_times = times[3::7]
+    durations = get_time_step_durations(strided_times)
+    assert np.isclose(durations.sum(), get_span_hours(strided_times))
+
+
+def test_single_sample_has_no_duration():
+    assert np.array_equal(get_time_step_durations(get_times([0])), np.zeros(1))
+
+
+def test_time_above_constant_depth_is_window_span():
+    times = get_times(np.arange(0, 121, 15))
+    results = reduce_time_series(
+        np.full((1, len(times)), 2.0),
+        ["max", "time_above_0.5", "depth_integral"],
+        axis=1,
+        invert_levels=np.array([1.0]),
+        durations=get_time_step_durations(times),
+    )
+    assert np.isclose(results["time_above_0.5"][0], 2.0)
+    assert np.isclose(results["depth_integral"][0], 2.0)